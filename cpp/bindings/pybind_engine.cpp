@@ -1,8 +1,12 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/functional.h>
+#include <pybind11/numpy.h>
+
+#include <stdexcept>
 
 #include "inference_engine.h"
+#include "audio_convert.h"
 
 namespace py = pybind11;
 
@@ -71,11 +75,13 @@ PYBIND11_MODULE(cockpit_engine_py, m) {
     py::class_<cockpit::LLMEngine>(m, "LLMEngine")
         .def(py::init<const cockpit::EngineConfig&>(),
              py::arg("config"),
+             py::call_guard<py::gil_scoped_release>(),
              "Create engine with full configuration")
         .def(py::init<const std::string&, int, int>(),
              py::arg("model_path"),
              py::arg("n_ctx") = 4096,
              py::arg("n_gpu_layers") = 35,
+             py::call_guard<py::gil_scoped_release>(),
              "Create engine with model path")
         
         .def("is_initialized", &cockpit::LLMEngine::is_initialized,
@@ -84,6 +90,7 @@ PYBIND11_MODULE(cockpit_engine_py, m) {
         .def("generate", &cockpit::LLMEngine::generate,
              py::arg("messages"),
              py::arg("config") = cockpit::GenerationConfig(),
+             py::call_guard<py::gil_scoped_release>(),
              "Generate response (non-streaming)")
         
         .def("generate_stream", 
@@ -107,6 +114,11 @@ PYBIND11_MODULE(cockpit_engine_py, m) {
              py::arg("config") = cockpit::GenerationConfig(),
              "Generate response with streaming callback")
         
+        .def("prefill", &cockpit::LLMEngine::prefill,
+             py::arg("messages"),
+             py::call_guard<py::gil_scoped_release>(),
+             "Prefill KV cache with messages without generating")
+        
         .def("parse_function_call", &cockpit::LLMEngine::parse_function_call,
              py::arg("response"),
              "Parse function call from response")
@@ -152,6 +164,23 @@ PYBIND11_MODULE(cockpit_engine_py, m) {
         return cockpit::Message(role, content);
     }, py::arg("role"), py::arg("content"), "Create a message");
     
+    // 音频格式转换（不做隐式类型转换，要求连续的int16输入和float32输出）
+    m.def("pcm16_to_float32", [](
+            py::array_t<int16_t, py::array::c_style> src,
+            py::array_t<float, py::array::c_style> dst) {
+        if (dst.size() < src.size()) {
+            throw std::invalid_argument("dst is smaller than src");
+        }
+        const int16_t* in = src.data();
+        float* out = dst.mutable_data();
+        size_t n = static_cast<size_t>(src.size());
+        {
+            py::gil_scoped_release release;
+            cockpit::pcm16_to_float32(in, out, n);
+        }
+    }, py::arg("src").noconvert(), py::arg("dst").noconvert(),
+       "Convert int16 PCM to float32 in [-1, 1) into dst");
+    
     // 版本信息
     m.attr("__version__") = "1.0.0";
 }
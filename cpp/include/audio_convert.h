@@ -0,0 +1,19 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+namespace cockpit {
+
+/**
+ * int16 PCM转换为[-1, 1)范围的float32（乘以1/32768）
+ * 
+ * 支持AVX2时每次处理16个采样；大块数据且目标地址32字节对齐时
+ * 使用非临时存储写入，避免目标缓冲区污染缓存。
+ * @param src 源数据
+ * @param dst 目标数据（长度至少为n）
+ * @param n 采样数
+ */
+void pcm16_to_float32(const int16_t* src, float* dst, size_t n);
+
+} // namespace cockpit
@@ -137,6 +137,14 @@ public:
         const GenerationConfig& config = GenerationConfig()
     );
     
+    /**
+     * 预填充KV缓存（不生成）
+     * 
+     * 后续以相同消息为前缀的请求将直接复用这部分缓存
+     * @param messages 对话消息列表（如系统提示词）
+     */
+    void prefill(const std::vector<Message>& messages);
+    
     /**
      * 解析函数调用
      * @param response LLM响应文本
@@ -156,7 +164,7 @@ public:
     void clear_cache();
     
     /**
-     * 保存会话状态
+     * 保存会话状态（token历史及KV缓存）
      * @param path 保存路径
      * @return 是否成功
      */
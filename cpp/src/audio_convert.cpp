@@ -0,0 +1,57 @@
+#include "audio_convert.h"
+
+#if defined(__AVX2__)
+#include <immintrin.h>
+#endif
+
+namespace cockpit {
+
+namespace {
+
+constexpr float kInt16Scale = 1.0f / 32768.0f;
+
+// 超过该采样数时才使用非临时存储（小块数据随后就会被读取，留在缓存中更好）
+constexpr size_t kStreamThreshold = 1 << 16;
+
+} // namespace
+
+void pcm16_to_float32(const int16_t* src, float* dst, size_t n) {
+    size_t i = 0;
+
+#if defined(__AVX2__)
+    const __m256 scale = _mm256_set1_ps(kInt16Scale);
+    const bool stream = n >= kStreamThreshold;
+
+    if (stream) {
+        // 标量处理到目标地址32字节对齐
+        while (i < n && (reinterpret_cast<uintptr_t>(dst + i) & 31) != 0) {
+            dst[i] = src[i] * kInt16Scale;
+            ++i;
+        }
+    }
+
+    for (; i + 16 <= n; i += 16) {
+        __m128i lo = _mm_loadu_si128(reinterpret_cast<const __m128i*>(src + i));
+        __m128i hi = _mm_loadu_si128(reinterpret_cast<const __m128i*>(src + i + 8));
+        __m256 flo = _mm256_mul_ps(_mm256_cvtepi32_ps(_mm256_cvtepi16_epi32(lo)), scale);
+        __m256 fhi = _mm256_mul_ps(_mm256_cvtepi32_ps(_mm256_cvtepi16_epi32(hi)), scale);
+        if (stream) {
+            _mm256_stream_ps(dst + i, flo);
+            _mm256_stream_ps(dst + i + 8, fhi);
+        } else {
+            _mm256_storeu_ps(dst + i, flo);
+            _mm256_storeu_ps(dst + i + 8, fhi);
+        }
+    }
+
+    if (stream) {
+        _mm_sfence();
+    }
+#endif
+
+    for (; i < n; ++i) {
+        dst[i] = src[i] * kInt16Scale;
+    }
+}
+
+} // namespace cockpit
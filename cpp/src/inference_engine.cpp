@@ -82,12 +82,64 @@ struct LLMEngine::Impl {
         return true;
     }
     
-    std::string format_messages(const std::vector<Message>& messages) {
+    std::string format_messages(const std::vector<Message>& messages, bool add_generation_prompt = true) {
         std::vector<std::pair<std::string, std::string>> msg_pairs;
         for (const auto& msg : messages) {
             msg_pairs.emplace_back(msg.role, msg.content);
         }
-        return tokenizer.apply_chat_template(msg_pairs, true);
+        return tokenizer.apply_chat_template(msg_pairs, add_generation_prompt);
+    }
+    
+    /**
+     * 评估prompt tokens，复用与token_history最长公共前缀对应的KV缓存，
+     * 只对新增部分分批解码
+     */
+    void eval_prompt(const std::vector<int32_t>& tokens) {
+        // 计算可复用的缓存
+        int n_reuse = 0;
+        for (size_t i = 0; i < std::min(tokens.size(), token_history.size()); i++) {
+            if (tokens[i] == token_history[i]) {
+                n_reuse++;
+            } else {
+                break;
+            }
+        }
+        
+        // 完全命中时重新解码最后一个token以获得logits
+        if (n_reuse == (int)tokens.size() && n_reuse > 0) {
+            n_reuse--;
+        }
+        
+        // 如果需要清除部分缓存
+        if (n_reuse < n_past) {
+            llama_kv_cache_seq_rm(ctx, 0, n_reuse, -1);
+            n_past = n_reuse;
+        }
+        
+        // 按n_batch分批处理新的prompt tokens
+        llama_batch batch = llama_batch_init(config.n_batch, 0, 1);
+        
+        while (n_past < (int)tokens.size()) {
+            int n_eval = std::min((int)tokens.size() - n_past, config.n_batch);
+            
+            llama_batch_clear(batch);
+            for (int i = 0; i < n_eval; i++) {
+                llama_batch_add(batch, tokens[n_past + i], n_past + i, {0}, false);
+            }
+            batch.logits[batch.n_tokens - 1] = true;
+            
+            if (llama_decode(ctx, batch) != 0) {
+                llama_batch_free(batch);
+                throw std::runtime_error("Failed to decode prompt");
+            }
+            
+            n_past += n_eval;
+        }
+        
+        llama_batch_free(batch);
+        
+        // 更新token历史
+        token_history = tokens;
     }
 };
 
@@ -153,45 +205,7 @@ std::string LLMEngine::generate_stream(
         throw std::runtime_error("Prompt too long for context window");
     }
     
-    // 计算可复用的缓存
-    int n_reuse = 0;
-    for (size_t i = 0; i < std::min(tokens.size(), pimpl_->token_history.size()); i++) {
-        if (tokens[i] == pimpl_->token_history[i]) {
-            n_reuse++;
-        } else {
-            break;
-        }
-    }
-    
-    // 如果需要清除部分缓存
-    if (n_reuse < pimpl_->n_past) {
-        llama_kv_cache_seq_rm(pimpl_->ctx, 0, n_reuse, -1);
-        pimpl_->n_past = n_reuse;
-    }
-    
-    // 处理新的prompt tokens
-    if ((int)tokens.size() > pimpl_->n_past) {
-        std::vector<int32_t> new_tokens(tokens.begin() + pimpl_->n_past, tokens.end());
-        
-        // 批量处理
-        llama_batch batch = llama_batch_init(pimpl_->config.n_batch, 0, 1);
-        
-        for (size_t i = 0; i < new_tokens.size(); i++) {
-            llama_batch_add(batch, new_tokens[i], pimpl_->n_past + i, {0}, false);
-        }
-        batch.logits[batch.n_tokens - 1] = true;
-        
-        if (llama_decode(pimpl_->ctx, batch) != 0) {
-            llama_batch_free(batch);
-            throw std::runtime_error("Failed to decode prompt");
-        }
-        
-        llama_batch_free(batch);
-        pimpl_->n_past = tokens.size();
-    }
-    
-    // 更新token历史
-    pimpl_->token_history = tokens;
+    pimpl_->eval_prompt(tokens);
     
     // 配置采样器
     SamplerConfig sampler_config;
@@ -286,6 +300,23 @@ std::string LLMEngine::generate(
     return generate_stream(messages, nullptr, config);
 }
 
+void LLMEngine::prefill(const std::vector<Message>& messages) {
+    if (!is_initialized()) {
+        throw std::runtime_error("Engine not initialized");
+    }
+    
+    // 不添加生成提示，使后续请求的prompt以此为前缀
+    std::string prompt = pimpl_->format_messages(messages, false);
+    std::vector<int32_t> tokens = pimpl_->tokenizer.encode(prompt, false, true);
+    
+    if (tokens.size() >= (size_t)pimpl_->config.n_ctx) {
+        throw std::runtime_error("Prompt too long for context window");
+    }
+    
+    pimpl_->eval_prompt(tokens);
+    stats_.context_tokens = pimpl_->n_past;
+}
+
 // ============================================================================
 // Function Calling
 // ============================================================================
@@ -353,36 +384,28 @@ void LLMEngine::clear_cache() {
 bool LLMEngine::save_session(const std::string& path) {
     if (!is_initialized()) return false;
     
-    // 保存token历史
-    std::ofstream file(path, std::ios::binary);
-    if (!file) return false;
-    
-    size_t size = pimpl_->token_history.size();
-    file.write(reinterpret_cast<const char*>(&size), sizeof(size));
-    file.write(reinterpret_cast<const char*>(pimpl_->token_history.data()), 
-               size * sizeof(int32_t));
-    
-    // TODO: 保存KV缓存状态
-    
-    return true;
+    // 保存token历史及对应的KV缓存状态
+    return llama_state_save_file(
+        pimpl_->ctx, path.c_str(),
+        pimpl_->token_history.data(), pimpl_->token_history.size()
+    );
 }
 
 bool LLMEngine::load_session(const std::string& path) {
     if (!is_initialized()) return false;
     
-    std::ifstream file(path, std::ios::binary);
-    if (!file) return false;
-    
-    size_t size;
-    file.read(reinterpret_cast<char*>(&size), sizeof(size));
+    std::vector<int32_t> tokens(pimpl_->config.n_ctx);
+    size_t n_loaded = 0;
     
-    pimpl_->token_history.resize(size);
-    file.read(reinterpret_cast<char*>(pimpl_->token_history.data()), 
-              size * sizeof(int32_t));
+    if (!llama_state_load_file(pimpl_->ctx, path.c_str(),
+                               tokens.data(), tokens.size(), &n_loaded)) {
+        clear_cache();
+        return false;
+    }
     
-    // 重新处理tokens
-    clear_cache();
-    // TODO: 恢复KV缓存状态
+    tokens.resize(n_loaded);
+    pimpl_->token_history = std::move(tokens);
+    pimpl_->n_past = (int)n_loaded;
     
     return true;
 }
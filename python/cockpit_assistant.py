@@ -5,12 +5,16 @@ Cockpit Assistant - 智能座舱助手主类
 """
 
 import asyncio
+import functools
+import hashlib
 import json
 import os
-from typing import AsyncIterator, Optional, List, Dict, Any, Callable
-from dataclasses import dataclass
-from queue import Queue
-from threading import Thread
+import re
+import time
+from typing import AsyncIterator, Optional, List, Dict, Any, Callable, Deque
+from collections import deque
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 # 尝试导入C++引擎，如果失败则使用模拟引擎
@@ -21,6 +25,13 @@ except ImportError:
     HAS_CPP_ENGINE = False
     print("Warning: C++ engine not available, using mock engine")
 
+# orjson可选，用于加速函数调用参数的JSON编解码
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 from vehicle_controller import VehicleController
 from function_registry import FunctionRegistry, get_function_prompt
 
@@ -29,16 +40,30 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+if HAS_ORJSON:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+
 # =============================================================================
 # 数据类型定义
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ChatMessage:
     """聊天消息"""
     role: str           # system, user, assistant
     content: str
     function_call: Optional[Dict[str, Any]] = None
+    # 对应的引擎消息对象，构建prompt时直接复用
+    engine_message: Any = field(default=None, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -46,19 +71,46 @@ class ChatMessage:
             "content": self.content,
             "function_call": self.function_call
         }
+    
+    def to_json(self) -> str:
+        """序列化为JSON（有orjson时走快速路径）"""
+        return _json_dumps(self.to_dict())
 
 
 # =============================================================================
 # 模拟引擎（用于测试，当C++引擎不可用时）
 # =============================================================================
 
+# 函数调用JSON: {"name": "...", "arguments": {...}}
+_FC_RE = re.compile(r'\{[^{}]*"name"\s*:\s*"[^"]+"\s*,\s*"arguments"\s*:\s*\{[^{}]*\}[^{}]*\}')
+_NUM_RE = re.compile(r'(\d+)')
+
+# 关键词路由表：一次扫描得到输入命中的所有意图
+_ROUTE_KEYWORDS = {
+    "空调": "ac",
+    "车窗": "window",
+    "导航": "nav", "去": "nav",
+    "播放": "music", "音乐": "music", "歌": "music",
+    "状态": "status", "电量": "status", "续航": "status",
+    "天气": "weather",
+}
+_ROUTE_RE = re.compile("|".join(map(re.escape, _ROUTE_KEYWORDS)))
+
+# 参数提取：目的地 / 音乐查询
+_NAV_RE = re.compile(r'(?:导航到|带我去|去|到)\s*(.{0,20})')
+_MUSIC_RE = re.compile(r'播放\s*(.{0,20})')
+
 class MockMessage:
+    __slots__ = ("role", "content")
+    
     def __init__(self, role: str = "", content: str = ""):
         self.role = role
         self.content = content
 
 
 class MockGenerationConfig:
+    __slots__ = ("temperature", "top_p", "top_k", "max_tokens", "repeat_penalty", "stop_sequences")
+    
     def __init__(self):
         self.temperature = 0.7
         self.top_p = 0.9
@@ -69,6 +121,8 @@ class MockGenerationConfig:
 
 
 class MockFunctionCall:
+    __slots__ = ("name", "arguments")
+    
     def __init__(self, name: str = "", arguments: str = ""):
         self.name = name
         self.arguments = arguments
@@ -91,6 +145,10 @@ class MockLLMEngine:
         """非流式生成"""
         return self._mock_response(messages)
     
+    def prefill(self, messages: List[MockMessage]):
+        """预填充KV缓存（模拟引擎无缓存，仅记录上下文用量）"""
+        self._context_usage = sum(len(m.content) for m in messages)
+    
     def generate_stream(self, messages: List[MockMessage], callback: Callable, 
                        config: MockGenerationConfig = None) -> str:
         """流式生成"""
@@ -111,44 +169,38 @@ class MockLLMEngine:
         last_msg = messages[-1].content.lower() if messages else ""
         
         # 简单的关键词匹配
-        if "空调" in last_msg:
+        hits = {_ROUTE_KEYWORDS[kw] for kw in _ROUTE_RE.findall(last_msg)}
+        
+        if "ac" in hits:
             if "打开" in last_msg or "开" in last_msg:
                 temp = 24
                 if "度" in last_msg:
-                    import re
-                    match = re.search(r'(\d+)', last_msg)
+                    match = _NUM_RE.search(last_msg)
                     if match:
                         temp = int(match.group(1))
                 return f'{{"name": "control_air_conditioner", "arguments": {{"action": "on", "temperature": {temp}}}}}\n好的，我来帮您打开空调。'
             elif "关" in last_msg:
                 return '{"name": "control_air_conditioner", "arguments": {"action": "off"}}\n好的，已关闭空调。'
         
-        elif "车窗" in last_msg:
+        elif "window" in hits:
             action = "open" if "打开" in last_msg or "开" in last_msg else "close"
             return f'{{"name": "control_window", "arguments": {{"position": "all", "action": "{action}"}}}}\n好的，正在操作车窗。'
         
-        elif "导航" in last_msg or "去" in last_msg:
+        elif "nav" in hits:
             # 提取目的地
-            dest = "目的地"
-            keywords = ["去", "到", "导航到", "带我去"]
-            for kw in keywords:
-                if kw in last_msg:
-                    idx = last_msg.find(kw) + len(kw)
-                    dest = last_msg[idx:].strip()[:20]
-                    break
+            m = _NAV_RE.search(last_msg)
+            dest = m.group(1).strip() if m else "目的地"
             return f'{{"name": "navigate_to", "arguments": {{"destination": "{dest}"}}}}\n好的，正在为您规划路线。'
         
-        elif "播放" in last_msg or "音乐" in last_msg or "歌" in last_msg:
-            query = "流行音乐"
-            if "播放" in last_msg:
-                idx = last_msg.find("播放") + 2
-                query = last_msg[idx:].strip()[:20] or "流行音乐"
+        elif "music" in hits:
+            m = _MUSIC_RE.search(last_msg)
+            query = (m.group(1).strip() if m else "") or "流行音乐"
             return f'{{"name": "play_music", "arguments": {{"query": "{query}", "action": "play"}}}}\n好的，正在播放音乐。'
         
-        elif "状态" in last_msg or "电量" in last_msg or "续航" in last_msg:
+        elif "status" in hits:
             return '{"name": "get_vehicle_status", "arguments": {"info_type": "all"}}\n好的，我来查询车辆状态。'
         
-        elif "天气" in last_msg:
+        elif "weather" in hits:
             return '{"name": "get_weather", "arguments": {"type": "current"}}\n好的，我来查询天气。'
         
         return "好的，我明白了。还有什么需要帮助的吗？"
@@ -157,23 +209,28 @@ class MockLLMEngine:
         """解析函数调用"""
         try:
             # 查找JSON
-            import re
-            pattern = r'\{[^{}]*"name"\s*:\s*"[^"]+"\s*,\s*"arguments"\s*:\s*\{[^{}]*\}[^{}]*\}'
-            match = re.search(pattern, response)
+            match = _FC_RE.search(response)
             if match:
                 json_str = match.group(0)
-                data = json.loads(json_str)
+                data = _json_loads(json_str)
                 return MockFunctionCall(
                     name=data.get("name", ""),
-                    arguments=json.dumps(data.get("arguments", {}))
+                    arguments=_json_dumps(data.get("arguments", {}))
                 )
-        except:
+        except (ValueError, AttributeError):
+            # JSON解析失败（含JSONDecodeError）或结构不符
             pass
         return None
     
     def clear_cache(self):
         self._context_usage = 0
     
+    def save_session(self, path: str) -> bool:
+        return False
+    
+    def load_session(self, path: str) -> bool:
+        return False
+    
     def get_context_usage(self) -> int:
         return self._context_usage
     
@@ -198,6 +255,12 @@ else:
     ConfigClass = MockGenerationConfig
 
 
+@functools.lru_cache(maxsize=None)
+def _build_system_prompt(template: str) -> str:
+    """格式化系统提示词（模板与函数说明在运行期不变，多个实例共享同一字符串）"""
+    return template.format(functions=get_function_prompt())
+
+
 # =============================================================================
 # 智能座舱助手
 # =============================================================================
@@ -247,6 +310,13 @@ class CockpitAssistant:
 助手: {{"name": "get_vehicle_status", "arguments": {{"info_type": "battery"}}}}
 好的，我来查看电池状态。'''
 
+    # 流式输出合并：每累计N个token或间隔超过T秒输出一次
+    STREAM_BATCH_TOKENS = 4
+    STREAM_BATCH_INTERVAL = 0.008
+
+    # 系统提示词KV缓存的磁盘目录
+    SESSION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cockpit")
+
     def __init__(
         self, 
         model_path: str,
@@ -263,18 +333,23 @@ class CockpitAssistant:
             n_gpu_layers: GPU层数
             max_history: 保留的最大对话历史轮数
         """
-        # 初始化LLM引擎
-        logger.info(f"Loading model: {model_path}")
-        self.engine = EngineClass(model_path, n_ctx, n_gpu_layers)
+        # 推理线程（常驻，单线程保证引擎调用串行）
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
         
-        # 初始化车辆控制器
-        self.controller = VehicleController()
+        # 在推理线程加载LLM引擎，同时在当前线程完成其余初始化
+        logger.info(f"Loading model: {model_path}")
+        engine_future = self._executor.submit(EngineClass, model_path, n_ctx, n_gpu_layers)
+        self._model_path = model_path
+        self._n_ctx = n_ctx
         
         # 初始化函数注册表
         self.function_registry = FunctionRegistry()
         
+        # 初始化车辆控制器
+        self.controller = VehicleController(registry=self.function_registry)
+        
         # 对话历史
-        self.conversation_history: List[ChatMessage] = []
+        self.conversation_history: Deque[ChatMessage] = deque()
         self.max_history = max_history
         
         # 生成配置
@@ -283,9 +358,17 @@ class CockpitAssistant:
         self.gen_config.max_tokens = 256
         
         # 构建系统提示词
-        self._system_prompt = self.SYSTEM_PROMPT_TEMPLATE.format(
-            functions=get_function_prompt()
-        )
+        self._system_prompt = _build_system_prompt(self.SYSTEM_PROMPT_TEMPLATE)
+        self._system_msg = MessageClass("system", self._system_prompt)
+        
+        # 等待模型加载完成
+        self.engine = engine_future.result()
+        
+        # 系统提示词在整个会话中不变，预先填充其KV缓存，后续每轮只需处理增量部分
+        self._prefill_system_prompt()
+        
+        # 在推理线程后台预热（首次前向会触发CUDA内核编译/调优），不阻塞初始化返回
+        self._warmup_future = self._executor.submit(self._warmup)
         
         logger.info("CockpitAssistant initialized successfully")
     
@@ -299,8 +382,34 @@ class CockpitAssistant:
         Yields:
             响应文本片段
         """
+        chunks: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self.chat_into(user_input, chunks.put_nowait))
+        task.add_done_callback(lambda _: chunks.put_nowait(None))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            await task
+        finally:
+            # 调用方提前退出时取消生成
+            if not task.done():
+                task.cancel()
+    
+    async def chat_into(self, user_input: str, sink: Callable[[str], None]) -> str:
+        """
+        处理用户输入，把响应文本片段依次交给sink（逐片段直接回调，无生成器开销）
+        
+        Args:
+            user_input: 用户输入文本
+            sink: 接收响应文本片段的回调
+            
+        Returns:
+            完整的响应文本
+        """
         # 添加用户消息
-        self.conversation_history.append(ChatMessage(role="user", content=user_input))
+        self.conversation_history.append(self._make_message("user", user_input))
         
         # 构建消息列表
         messages = self._build_messages()
@@ -308,70 +417,129 @@ class CockpitAssistant:
         # 流式生成
         full_response = ""
         
-        # 使用队列在线程间传递token
-        token_queue: Queue = Queue()
+        # 推理线程把token追加到缓冲区，每批只唤醒一次事件循环
+        # （事件循环处理唤醒前追加的token不再触发新的跨线程调度）
+        loop = asyncio.get_running_loop()
+        token_buffer: Deque = deque()
+        token_ready = asyncio.Event()
+        wakeup_pending = False
         
         def stream_callback(token: str, is_end: bool):
-            token_queue.put((token, is_end))
+            nonlocal wakeup_pending
+            token_buffer.append((token, is_end))
+            if not wakeup_pending:
+                wakeup_pending = True
+                loop.call_soon_threadsafe(token_ready.set)
         
-        # 在后台线程运行推理
+        # 在推理线程运行推理
         def run_inference():
             try:
                 result = self.engine.generate_stream(messages, stream_callback, self.gen_config)
                 return result
             except Exception as e:
                 logger.error(f"Inference error: {e}")
-                token_queue.put(("", True))
+                stream_callback("", True)
                 return ""
         
-        inference_thread = Thread(target=run_inference)
-        inference_thread.start()
+        inference_future = loop.run_in_executor(self._executor, run_inference)
         
-        # 流式返回token
-        while True:
-            try:
-                token, is_end = await asyncio.get_event_loop().run_in_executor(
-                    None, token_queue.get, True, 30.0
-                )
-                
-                if is_end:
-                    break
-                
-                full_response += token
-                yield token
+        # 流式输出token（小批量合并，减少调用方逐token处理的开销）
+        function_call = None
+        function_task: Optional[asyncio.Task] = None
+        stream_done = False
+        pending: List[str] = []
+        last_flush = time.monotonic()
+        try:
+            while not stream_done:
+                await token_ready.wait()
+                # 先复位唤醒标记再取数据，之后追加的token会重新唤醒
+                token_ready.clear()
+                wakeup_pending = False
                 
-            except Exception:
-                break
-        
-        inference_thread.join()
-        
-        # 检查是否有函数调用
-        function_call = self.engine.parse_function_call(full_response)
-        
-        if function_call:
-            # 执行函数
+                while token_buffer:
+                    token, is_end = token_buffer.popleft()
+                    
+                    if is_end:
+                        stream_done = True
+                        break
+                    
+                    full_response += token
+                    
+                    # 函数调用JSON位于回复最前面，一旦闭合立即派发执行，与后续文本生成重叠
+                    if function_task is None and "}" in token:
+                        function_call = self.engine.parse_function_call(full_response)
+                        if function_call:
+                            function_task = asyncio.create_task(self._execute_function_call(function_call))
+                    
+                    pending.append(token)
+                    now = time.monotonic()
+                    if (len(pending) >= self.STREAM_BATCH_TOKENS
+                            or now - last_flush >= self.STREAM_BATCH_INTERVAL):
+                        sink("".join(pending))
+                        pending.clear()
+                        last_flush = now
+        finally:
+            # 被取消时停止生成，避免占用推理线程
+            if not stream_done:
+                self.engine.stop_generation()
+                # 已派发的车辆操作不会撤回：等待其完成并记入历史，使历史与车辆状态一致
+                # （调用方已离开，结果不再交给sink）
+                if function_task is not None:
+                    await self._finish_reply(full_response, function_call, function_task, None)
+        
+        if pending:
+            sink("".join(pending))
+        
+        await inference_future
+        
+        # 生成过程中未检测到时，再检查完整回复中是否有函数调用
+        if function_task is None:
+            function_call = self.engine.parse_function_call(full_response)
+            if function_call:
+                function_task = asyncio.create_task(self._execute_function_call(function_call))
+        
+        return await self._finish_reply(full_response, function_call, function_task, sink)
+    
+    async def _finish_reply(
+        self,
+        full_response: str,
+        function_call,
+        function_task: Optional[asyncio.Task],
+        sink: Optional[Callable[[str], None]]
+    ) -> str:
+        """等待函数执行结果并追加到回复，保存助手回复到历史"""
+        if function_task:
+            # 等待函数执行完成（shield：本协程再次被取消时车辆操作仍会完成）
             try:
-                args = json.loads(function_call.arguments) if isinstance(function_call.arguments, str) else function_call.arguments
-                result = await self.controller.execute(function_call.name, args)
+                result = await asyncio.shield(function_task)
                 
                 # 返回执行结果
-                yield f"\n\n✅ {result}"
+                if sink:
+                    sink(f"\n\n✅ {result}")
                 full_response += f"\n\n{result}"
                 
             except Exception as e:
                 error_msg = f"\n\n❌ 执行失败: {str(e)}"
-                yield error_msg
+                if sink:
+                    sink(error_msg)
                 full_response += error_msg
         
         # 保存助手回复
-        self.conversation_history.append(ChatMessage(
-            role="assistant", 
-            content=full_response,
+        self.conversation_history.append(self._make_message(
+            "assistant",
+            full_response,
             function_call={"name": function_call.name, "arguments": function_call.arguments} if function_call else None
         ))
         
         # 限制历史长度
         self._trim_history()
+        
+        return full_response
+    
+    async def _execute_function_call(self, function_call) -> str:
+        """执行解析出的函数调用"""
+        args = _json_loads(function_call.arguments) if isinstance(function_call.arguments, str) else function_call.arguments
+        return await self.controller.execute(function_call.name, args)
     
     async def chat_sync(self, user_input: str) -> str:
         """
@@ -383,32 +551,115 @@ class CockpitAssistant:
         Returns:
             完整的响应文本
         """
-        full_response = ""
-        async for token in self.chat(user_input):
-            full_response += token
-        return full_response
+        parts: List[str] = []
+        await self.chat_into(user_input, parts.append)
+        return "".join(parts)
+    
+    @staticmethod
+    def _make_message(role: str, content: str,
+                      function_call: Optional[Dict[str, Any]] = None) -> ChatMessage:
+        """创建聊天消息，并一次性构建对应的引擎消息对象"""
+        return ChatMessage(
+            role=role,
+            content=content,
+            function_call=function_call,
+            engine_message=MessageClass(role, content)
+        )
     
     def _build_messages(self) -> List:
         """构建消息列表"""
-        messages = [MessageClass("system", self._system_prompt)]
+        messages = [self._system_msg]
         
-        # 添加历史消息
-        for msg in self.conversation_history[-self.max_history:]:
-            messages.append(MessageClass(msg.role, msg.content))
+        # 添加历史消息（历史已由_trim_history限长，整体发送以保持前缀稳定）
+        messages.extend(
+            msg.engine_message if msg.engine_message is not None
+            else MessageClass(msg.role, msg.content)
+            for msg in self.conversation_history
+        )
         
         return messages
     
     def _trim_history(self):
-        """裁剪对话历史"""
-        if len(self.conversation_history) > self.max_history * 2:
-            self.conversation_history = self.conversation_history[-self.max_history:]
+        """
+        裁剪对话历史
+        
+        超过max_history条时一次性丢弃较早的一半，而不是每轮滑动窗口。
+        这样两次裁剪之间每轮的prompt都是上一轮的前缀延伸，引擎可以复用
+        已有的KV缓存，只需预填充新增的消息。
+        """
+        history = self.conversation_history
+        if len(history) > self.max_history:
+            keep = self.max_history // 2
+            keep -= keep % 2  # 保持user/assistant成对
+            # 原地从左侧弹出，不重新分配列表
+            while len(history) > keep:
+                history.popleft()
+    
+    def _system_session_path(self) -> Optional[str]:
+        """系统提示词KV缓存文件路径（按模型和提示词内容哈希）"""
+        if not HAS_CPP_ENGINE:
+            return None
+        
+        mtime = os.path.getmtime(self._model_path) if os.path.exists(self._model_path) else 0
+        key = hashlib.sha1(
+            f"{self._model_path}|{mtime}|{self._n_ctx}|{self._system_prompt}".encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.SESSION_CACHE_DIR, f"system_{key[:16]}.session")
+    
+    def _prefill_system_prompt(self):
+        """预填充系统提示词的KV缓存，优先从磁盘恢复"""
+        try:
+            session_path = self._system_session_path()
+            if session_path and os.path.exists(session_path):
+                if self.engine.load_session(session_path):
+                    logger.info(f"System prompt KV cache loaded: {session_path}")
+                    return
+            
+            self.engine.prefill([self._system_msg])
+            
+            if session_path:
+                os.makedirs(os.path.dirname(session_path), exist_ok=True)
+                self.engine.save_session(session_path)
+        except Exception as e:
+            logger.warning(f"System prompt prefill failed: {e}")
+    
+    def _warmup(self):
+        """生成1个token预热推理内核，使首轮对话不承担一次性开销"""
+        try:
+            config = ConfigClass()
+            config.max_tokens = 1
+            self.engine.generate([self._system_msg, MessageClass("user", "你好")], config)
+            if hasattr(self.engine, 'reset_stats'):
+                self.engine.reset_stats()
+        except Exception as e:
+            logger.warning(f"Warmup failed: {e}")
+    
+    def wait_ready(self, timeout: Optional[float] = None):
+        """等待后台预热完成"""
+        self._warmup_future.result(timeout)
     
     def reset_conversation(self):
-        """重置对话"""
+        """
+        重置对话（同步调用方使用）
+        
+        引擎操作在推理线程执行，排在进行中的预热/推理之后，调用线程会阻塞到完成；
+        事件循环中请使用reset_conversation_async。
+        """
         self.conversation_history.clear()
-        self.engine.clear_cache()
+        self._executor.submit(self._reset_engine).result()
         logger.info("Conversation reset")
     
+    async def reset_conversation_async(self):
+        """重置对话（异步版本，等待推理线程期间不阻塞事件循环）"""
+        self.conversation_history.clear()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._reset_engine)
+        logger.info("Conversation reset")
+    
+    def _reset_engine(self):
+        """清空KV缓存并重新填充系统提示词"""
+        self.engine.clear_cache()
+        self._prefill_system_prompt()
+    
     def get_vehicle_state(self) -> Dict[str, Any]:
         """获取当前车辆状态"""
         return self.controller.get_state_summary()
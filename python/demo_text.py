@@ -78,6 +78,7 @@ async def main(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 35):
                 n_ctx=n_ctx,
                 n_gpu_layers=n_gpu_layers
             )
+            assistant.wait_ready()
         except Exception as e:
             console.print(f"[red]加载模型失败: {e}[/red]")
             return
@@ -100,7 +101,7 @@ async def main(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 35):
                 break
             
             if user_input.lower() in ["clear", "reset"]:
-                assistant.reset_conversation()
+                await assistant.reset_conversation_async()
                 console.print("[green]✓ 对话已重置[/green]\n")
                 continue
             
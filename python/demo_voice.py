@@ -107,6 +107,11 @@ async def main(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 35,
     
     console.print("[green]✓ 系统初始化完成！[/green]\n")
     
+    # 后台预热常用短句的TTS缓存
+    prewarm_task = asyncio.create_task(
+        assistant.voice.tts.prewarm(CockpitVoiceAssistant.COMMON_PHRASES)
+    ) if HAS_EDGE_TTS else None
+    
     # 使用说明
     console.print(Panel(
         "[bold]使用说明:[/bold]\n\n"
@@ -141,19 +146,7 @@ async def main(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 35,
                 # 处理文本输入
                 console.print("[bold green]Assistant:[/bold green] ", end="")
                 
-                response_text = ""
-                async for token in assistant.assistant.chat(user_input):
-                    console.print(token, end="", highlight=False)
-                    response_text += token
-                
-                console.print()
-                
-                # TTS播报
-                if HAS_EDGE_TTS:
-                    clean_text = _clean_for_tts(response_text)
-                    if clean_text:
-                        with console.status("[dim]正在播报...[/dim]"):
-                            await assistant.voice.speak(clean_text)
+                await _chat_and_speak(assistant, user_input, HAS_EDGE_TTS)
                 
             else:
                 # 语音输入模式
@@ -184,19 +177,7 @@ async def main(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 35,
                     # 获取响应
                     console.print("[bold green]Assistant:[/bold green] ", end="")
                     
-                    response_text = ""
-                    async for token in assistant.assistant.chat(user_text):
-                        console.print(token, end="", highlight=False)
-                        response_text += token
-                    
-                    console.print()
-                    
-                    # TTS播报
-                    if HAS_EDGE_TTS:
-                        clean_text = _clean_for_tts(response_text)
-                        if clean_text:
-                            with console.status("[dim]正在播报...[/dim]"):
-                                await assistant.voice.speak(clean_text)
+                    await _chat_and_speak(assistant, user_text, HAS_EDGE_TTS)
                     
                 except Exception as e:
                     console.print(f"[red]错误: {e}[/red]")
@@ -205,19 +186,25 @@ async def main(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 35,
             console.print("\n\n[yellow]已中断[/yellow]")
             break
     
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+    
     console.print("\n[yellow]再见！祝您行车安全！🚗[/yellow]\n")
 
 
-def _clean_for_tts(text: str) -> str:
-    """清理文本用于TTS"""
-    import re
-    # 移除JSON
-    cleaned = re.sub(r'\{[^}]+\}', '', text)
-    # 移除特殊符号
-    cleaned = re.sub(r'[✅❌🔧📊🔋🛞🛢️📍🌡️]', '', cleaned)
-    # 移除多余空白
-    cleaned = ' '.join(cleaned.split())
-    return cleaned.strip()
+async def _chat_and_speak(assistant, user_text: str, speak: bool):
+    """流式输出回复，开启语音时按句子边生成边播报"""
+    async def shown():
+        async for token in assistant.assistant.chat(user_text):
+            console.print(token, end="", highlight=False)
+            yield token
+        console.print()
+    
+    if speak:
+        await assistant.voice.speak_tokens(shown())
+    else:
+        async for _ in shown():
+            pass
 
 
 def run():
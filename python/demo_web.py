@@ -6,11 +6,14 @@ Demo Web - Web界面演示
 """
 
 import asyncio
+import gzip
+import hashlib
 import json
 import os
 import sys
-import argparse
+import threading
 from pathlib import Path
+from dataclasses import dataclass
 from typing import Optional
 import logging
 
@@ -18,598 +21,256 @@ import logging
 sys.path.insert(0, str(Path(__file__).parent))
 
 try:
-    from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-    from fastapi.staticfiles import StaticFiles
-    from fastapi.responses import HTMLResponse
-    import uvicorn
-    HAS_FASTAPI = True
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# uvloop/httptools可选，用于替换纯Python事件循环与HTTP解析器
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+try:
+    import httptools
+    HAS_HTTPTOOLS = True
+except ImportError:
+    HAS_HTTPTOOLS = False
+
+# orjson可选，用于加速WebSocket消息的JSON编解码
+try:
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_FASTAPI = False
-    print("请安装FastAPI: pip install fastapi uvicorn")
+    HAS_ORJSON = False
+
+# msgspec可选，用于按固定结构直接解码客户端消息
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
 
 from cockpit_assistant import CockpitAssistant
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# HTML模板
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>智能座舱助手</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-            background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
-            min-height: 100vh;
-            color: #fff;
-        }
-        
-        .container {
-            max-width: 900px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        
-        header {
-            text-align: center;
-            padding: 30px 0;
-        }
-        
-        header h1 {
-            font-size: 2.5rem;
-            background: linear-gradient(90deg, #00d2ff, #3a7bd5);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin-bottom: 10px;
-        }
-        
-        header p {
-            color: #888;
-            font-size: 1.1rem;
-        }
-        
-        .main-content {
-            display: grid;
-            grid-template-columns: 1fr 300px;
-            gap: 20px;
-        }
-        
-        @media (max-width: 768px) {
-            .main-content {
-                grid-template-columns: 1fr;
-            }
-        }
-        
-        .chat-container {
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 20px;
-            padding: 20px;
-            display: flex;
-            flex-direction: column;
-            height: 600px;
-        }
-        
-        .chat-messages {
-            flex: 1;
-            overflow-y: auto;
-            padding: 10px;
-            margin-bottom: 15px;
-        }
-        
-        .message {
-            margin-bottom: 15px;
-            animation: fadeIn 0.3s ease;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        
-        .message.user {
-            text-align: right;
-        }
-        
-        .message.assistant {
-            text-align: left;
-        }
-        
-        .message-content {
-            display: inline-block;
-            padding: 12px 18px;
-            border-radius: 18px;
-            max-width: 80%;
-            word-wrap: break-word;
-        }
-        
-        .user .message-content {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            border-bottom-right-radius: 4px;
-        }
-        
-        .assistant .message-content {
-            background: rgba(255, 255, 255, 0.1);
-            border-bottom-left-radius: 4px;
-        }
-        
-        .message-label {
-            font-size: 0.75rem;
-            color: #666;
-            margin-bottom: 5px;
-        }
-        
-        .function-call {
-            background: rgba(0, 210, 255, 0.1);
-            border-left: 3px solid #00d2ff;
-            padding: 10px;
-            margin-top: 10px;
-            border-radius: 0 10px 10px 0;
-            font-size: 0.85rem;
-        }
-        
-        .input-area {
-            display: flex;
-            gap: 10px;
-        }
-        
-        .input-area input {
-            flex: 1;
-            padding: 15px 20px;
-            border: none;
-            border-radius: 25px;
-            background: rgba(255, 255, 255, 0.1);
-            color: #fff;
-            font-size: 1rem;
-            outline: none;
-            transition: background 0.3s;
-        }
-        
-        .input-area input:focus {
-            background: rgba(255, 255, 255, 0.15);
-        }
-        
-        .input-area input::placeholder {
-            color: #666;
-        }
-        
-        .input-area button {
-            padding: 15px 25px;
-            border: none;
-            border-radius: 25px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #fff;
-            font-size: 1rem;
-            cursor: pointer;
-            transition: transform 0.2s, opacity 0.2s;
-        }
-        
-        .input-area button:hover {
-            transform: scale(1.05);
-        }
-        
-        .input-area button:disabled {
-            opacity: 0.5;
-            cursor: not-allowed;
-            transform: none;
-        }
-        
-        .status-panel {
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 20px;
-            padding: 20px;
-        }
-        
-        .status-panel h3 {
-            font-size: 1.1rem;
-            margin-bottom: 15px;
-            color: #00d2ff;
-        }
-        
-        .status-item {
-            display: flex;
-            justify-content: space-between;
-            padding: 10px 0;
-            border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        .status-item:last-child {
-            border-bottom: none;
-        }
-        
-        .status-label {
-            color: #888;
-        }
-        
-        .status-value {
-            font-weight: 600;
-        }
-        
-        .status-value.on {
-            color: #4caf50;
-        }
-        
-        .status-value.off {
-            color: #f44336;
-        }
-        
-        .quick-actions {
-            margin-top: 20px;
-        }
-        
-        .quick-actions h3 {
-            font-size: 1.1rem;
-            margin-bottom: 15px;
-            color: #00d2ff;
-        }
-        
-        .quick-btn {
-            display: block;
-            width: 100%;
-            padding: 10px;
-            margin-bottom: 8px;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            border-radius: 10px;
-            background: transparent;
-            color: #fff;
-            font-size: 0.9rem;
-            cursor: pointer;
-            transition: background 0.3s;
-        }
-        
-        .quick-btn:hover {
-            background: rgba(255, 255, 255, 0.1);
-        }
-        
-        .typing-indicator {
-            display: none;
-            padding: 10px;
-        }
-        
-        .typing-indicator.show {
-            display: block;
-        }
-        
-        .typing-indicator span {
-            display: inline-block;
-            width: 8px;
-            height: 8px;
-            background: #00d2ff;
-            border-radius: 50%;
-            margin: 0 2px;
-            animation: bounce 1.4s infinite;
-        }
-        
-        .typing-indicator span:nth-child(2) {
-            animation-delay: 0.2s;
-        }
-        
-        .typing-indicator span:nth-child(3) {
-            animation-delay: 0.4s;
-        }
-        
-        @keyframes bounce {
-            0%, 60%, 100% { transform: translateY(0); }
-            30% { transform: translateY(-10px); }
-        }
-        
-        .connection-status {
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            padding: 8px 15px;
-            border-radius: 20px;
-            font-size: 0.85rem;
-        }
-        
-        .connection-status.connected {
-            background: rgba(76, 175, 80, 0.2);
-            color: #4caf50;
-        }
-        
-        .connection-status.disconnected {
-            background: rgba(244, 67, 54, 0.2);
-            color: #f44336;
-        }
-    </style>
-</head>
-<body>
-    <div class="connection-status disconnected" id="connectionStatus">
-        断开连接
-    </div>
-    
-    <div class="container">
-        <header>
-            <h1>🚗 智能座舱助手</h1>
-            <p>Cockpit Assistant - AI驱动的车载交互系统</p>
-        </header>
-        
-        <div class="main-content">
-            <div class="chat-container">
-                <div class="chat-messages" id="chatMessages">
-                    <div class="message assistant">
-                        <div class="message-label">助手</div>
-                        <div class="message-content">
-                            你好！我是智能座舱助手小智，可以帮你控制空调、车窗、导航、音乐等。有什么需要帮助的吗？
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="typing-indicator" id="typingIndicator">
-                    <span></span><span></span><span></span>
-                </div>
-                
-                <div class="input-area">
-                    <input type="text" id="userInput" placeholder="输入消息..." autocomplete="off">
-                    <button id="sendBtn" onclick="sendMessage()">发送</button>
-                </div>
-            </div>
-            
-            <div class="status-panel">
-                <h3>🚙 车辆状态</h3>
-                <div class="status-item">
-                    <span class="status-label">空调</span>
-                    <span class="status-value off" id="acStatus">关闭</span>
-                </div>
-                <div class="status-item">
-                    <span class="status-label">温度</span>
-                    <span class="status-value" id="acTemp">24°C</span>
-                </div>
-                <div class="status-item">
-                    <span class="status-label">导航</span>
-                    <span class="status-value" id="navStatus">未启动</span>
-                </div>
-                <div class="status-item">
-                    <span class="status-label">音乐</span>
-                    <span class="status-value off" id="musicStatus">停止</span>
-                </div>
-                <div class="status-item">
-                    <span class="status-label">电量</span>
-                    <span class="status-value" id="batteryStatus">78%</span>
-                </div>
-                <div class="status-item">
-                    <span class="status-label">续航</span>
-                    <span class="status-value" id="rangeStatus">320km</span>
-                </div>
-                
-                <div class="quick-actions">
-                    <h3>⚡ 快捷指令</h3>
-                    <button class="quick-btn" onclick="quickSend('把空调打开')">打开空调</button>
-                    <button class="quick-btn" onclick="quickSend('查看车辆状态')">车辆状态</button>
-                    <button class="quick-btn" onclick="quickSend('播放音乐')">播放音乐</button>
-                    <button class="quick-btn" onclick="quickSend('打开全部车窗')">打开车窗</button>
-                    <button class="quick-btn" onclick="quickSend('导航到最近的加油站')">最近加油站</button>
-                </div>
-            </div>
-        </div>
-    </div>
+
+if HAS_ORJSON:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+# token帧结构固定，只需序列化token列表
+_TOKENS_PREFIX = '{"type":"tokens","items":'
+
+# 固定内容的帧，导入时序列化一次
+_END_FRAME = _json_dumps({"type": "end"})
+_NOT_READY_FRAME = _json_dumps({"type": "token", "content": "助手未初始化"})
+
+
+def _status_frame(status: dict) -> str:
+    """构造状态帧文本，外层结构固定，只序列化状态本身"""
+    return '{"type":"status","status":' + _json_dumps(status) + '}'
+
+
+# 客户端消息: {"type": "chat", "content": "..."}
+if HAS_MSGSPEC:
+    class ClientMessage(msgspec.Struct):
+        type: str = ""
+        content: str = ""
+
+    _decode_client_message = msgspec.json.Decoder(ClientMessage).decode
+else:
+    @dataclass(slots=True)
+    class ClientMessage:
+        type: str = ""
+        content: str = ""
+
+    def _decode_client_message(raw: str) -> ClientMessage:
+        data = _json_loads(raw)
+        return ClientMessage(data.get("type", ""), data.get("content", ""))
+
+
+# 页面文件
+STATIC_DIR = Path(__file__).parent / "static"
+HTML_TEMPLATE = (STATIC_DIR / "index.html").read_text(encoding="utf-8")
+
+
+def _minify_html(html: str) -> str:
+    """去除缩进、空行和整行JS注释（保留换行，不影响JS自动分号）"""
+    lines = (line.strip() for line in html.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+# 页面内容不变，导入时一次性压缩空白、编码并预压缩，请求时直接返回字节
+_HTML_UTF8 = _minify_html(HTML_TEMPLATE).encode("utf-8")
+_HTML_GZ = gzip.compress(_HTML_UTF8, 9)
+_HTML_BR = brotli.compress(_HTML_UTF8, quality=11) if HAS_BROTLI else None
+_HTML_ETAG = '"' + hashlib.sha1(_HTML_UTF8).hexdigest()[:16] + '"'
+_HTML_HEADERS = {
+    "Cache-Control": "public, max-age=3600",
+    "ETag": _HTML_ETAG,
+    "Vary": "Accept-Encoding",
+}
+
+
+# 全局助手实例（后台加载完成后设置）
+assistant: Optional[CockpitAssistant] = None
+
+# 同时进行的生成数上限（单模型上下文，多路生成只会互相交错），由main()按参数重设
+generation_slots = asyncio.Semaphore(1)
+generation_waiting = 0
+
+
+async def _send_json(websocket, obj):
+    """以文本帧发送JSON（浏览器端可直接JSON.parse）"""
+    await websocket.send_text(_json_dumps(obj))
+
+
+async def _drain_tokens(websocket, queue: asyncio.Queue) -> bool:
+    """
+    把队列中已到达的token合并为一帧发送，None表示结束
     
-    <script>
-        let ws = null;
-        let isGenerating = false;
-        let currentAssistantMessage = null;
-        
-        function connect() {
-            const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
-            
-            ws.onopen = () => {
-                document.getElementById('connectionStatus').textContent = '已连接';
-                document.getElementById('connectionStatus').className = 'connection-status connected';
-            };
-            
-            ws.onclose = () => {
-                document.getElementById('connectionStatus').textContent = '断开连接';
-                document.getElementById('connectionStatus').className = 'connection-status disconnected';
-                // 尝试重连
-                setTimeout(connect, 3000);
-            };
-            
-            ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                handleMessage(data);
-            };
-            
-            ws.onerror = (error) => {
-                console.error('WebSocket error:', error);
-            };
-        }
-        
-        function handleMessage(data) {
-            if (data.type === 'token') {
-                // 流式token
-                if (!currentAssistantMessage) {
-                    currentAssistantMessage = addMessage('assistant', '');
-                }
-                currentAssistantMessage.querySelector('.message-content').textContent += data.content;
-                scrollToBottom();
-            } else if (data.type === 'end') {
-                // 生成结束
-                isGenerating = false;
-                document.getElementById('typingIndicator').classList.remove('show');
-                document.getElementById('sendBtn').disabled = false;
-                currentAssistantMessage = null;
-            } else if (data.type === 'function_call') {
-                // 函数调用
-                if (currentAssistantMessage) {
-                    const fcDiv = document.createElement('div');
-                    fcDiv.className = 'function-call';
-                    fcDiv.textContent = `🔧 ${data.name}: ${data.result}`;
-                    currentAssistantMessage.appendChild(fcDiv);
-                }
-            } else if (data.type === 'status') {
-                // 更新状态
-                updateStatus(data.status);
-            }
-        }
-        
-        function addMessage(role, content) {
-            const messagesDiv = document.getElementById('chatMessages');
-            const messageDiv = document.createElement('div');
-            messageDiv.className = `message ${role}`;
-            
-            const labelDiv = document.createElement('div');
-            labelDiv.className = 'message-label';
-            labelDiv.textContent = role === 'user' ? '你' : '助手';
-            
-            const contentDiv = document.createElement('div');
-            contentDiv.className = 'message-content';
-            contentDiv.textContent = content;
-            
-            messageDiv.appendChild(labelDiv);
-            messageDiv.appendChild(contentDiv);
-            messagesDiv.appendChild(messageDiv);
-            
-            scrollToBottom();
-            return messageDiv;
-        }
-        
-        function scrollToBottom() {
-            const messagesDiv = document.getElementById('chatMessages');
-            messagesDiv.scrollTop = messagesDiv.scrollHeight;
-        }
-        
-        function sendMessage() {
-            const input = document.getElementById('userInput');
-            const message = input.value.trim();
-            
-            if (!message || isGenerating || !ws || ws.readyState !== WebSocket.OPEN) {
-                return;
-            }
-            
-            // 添加用户消息
-            addMessage('user', message);
-            input.value = '';
-            
-            // 发送到服务器
-            ws.send(JSON.stringify({ type: 'chat', content: message }));
-            
-            // 显示加载状态
-            isGenerating = true;
-            document.getElementById('typingIndicator').classList.add('show');
-            document.getElementById('sendBtn').disabled = true;
-        }
-        
-        function quickSend(message) {
-            document.getElementById('userInput').value = message;
-            sendMessage();
-        }
-        
-        function updateStatus(status) {
-            if (status.ac) {
-                document.getElementById('acStatus').textContent = status.ac.on ? '开启' : '关闭';
-                document.getElementById('acStatus').className = 'status-value ' + (status.ac.on ? 'on' : 'off');
-                document.getElementById('acTemp').textContent = status.ac.temperature + '°C';
-            }
-            if (status.navigation) {
-                document.getElementById('navStatus').textContent = status.navigation.active ? 
-                    (status.navigation.destination || '导航中') : '未启动';
-            }
-            if (status.music) {
-                document.getElementById('musicStatus').textContent = status.music.playing ? '播放中' : '停止';
-                document.getElementById('musicStatus').className = 'status-value ' + (status.music.playing ? 'on' : 'off');
-            }
-            if (status.battery !== undefined) {
-                document.getElementById('batteryStatus').textContent = status.battery + '%';
-            }
-            if (status.range !== undefined) {
-                document.getElementById('rangeStatus').textContent = status.range + 'km';
-            }
-        }
-        
-        // 回车发送
-        document.getElementById('userInput').addEventListener('keypress', (e) => {
-            if (e.key === 'Enter') {
-                sendMessage();
-            }
-        });
-        
-        // 连接WebSocket
-        connect();
-    </script>
-</body>
-</html>
-"""
+    结束标记与最后一批token同时到达时并入该帧，返回True，
+    调用方无需再单独发送end帧。
+    """
+    while True:
+        token = await queue.get()
+        if token is None:
+            return False
+        
+        batch = [token]
+        finished = False
+        while not queue.empty():
+            token = queue.get_nowait()
+            if token is None:
+                finished = True
+                break
+            batch.append(token)
+        
+        if finished:
+            await websocket.send_text(_TOKENS_PREFIX + _json_dumps(batch) + ',"end":true}')
+            return True
+        await websocket.send_text(_TOKENS_PREFIX + _json_dumps(batch) + "}")
 
 
-# 创建FastAPI应用
-if HAS_FASTAPI:
+def _make_app():
+    """创建FastAPI应用（在此处导入FastAPI，仅导入本模块时不加载Web框架）"""
+    from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+    from fastapi.staticfiles import StaticFiles
+    from fastapi.responses import HTMLResponse, Response
+    
     app = FastAPI(title="智能座舱助手")
-    assistant: Optional[CockpitAssistant] = None
+    # 其余静态资源由StaticFiles直接从文件提供
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
     
     @app.get("/", response_class=HTMLResponse)
-    async def index():
-        return HTML_TEMPLATE
+    async def index(request: Request):
+        # 客户端缓存仍有效时只返回304头部
+        if request.headers.get("if-none-match") == _HTML_ETAG:
+            return Response(status_code=304, headers=_HTML_HEADERS)
+        
+        accept_encoding = request.headers.get("accept-encoding", "")
+        if _HTML_BR is not None and "br" in accept_encoding:
+            body, encoding = _HTML_BR, "br"
+        elif "gzip" in accept_encoding:
+            body, encoding = _HTML_GZ, "gzip"
+        else:
+            body, encoding = _HTML_UTF8, None
+        
+        headers = dict(_HTML_HEADERS)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
     
     @app.websocket("/ws")
     async def websocket_endpoint(websocket: WebSocket):
-        global assistant
+        global generation_waiting
         
         await websocket.accept()
         logger.info("WebSocket connected")
         
+        # 上次发送的状态帧，状态未变化时不再重复发送
+        last_status_frame = None
+        
         try:
             # 发送初始状态
-            if assistant:
-                status = assistant.get_vehicle_state()
-                await websocket.send_json({"type": "status", "status": status})
+            current = assistant
+            if current:
+                last_status_frame = _status_frame(current.get_vehicle_state())
+                await websocket.send_text(last_status_frame)
             
             while True:
                 # 接收消息
-                data = await websocket.receive_json()
+                message = _decode_client_message(await websocket.receive_text())
                 
-                if data.get("type") == "chat":
-                    content = data.get("content", "")
+                if message.type == "chat":
+                    content = message.content
+                    # 模型在后台加载，每轮取一次，本轮内使用局部引用
+                    current = assistant
                     
-                    if assistant:
-                        # 流式响应
-                        async for token in assistant.chat(content):
-                            await websocket.send_json({
-                                "type": "token",
-                                "content": token
+                    if current:
+                        # 名额已满时告知排队位置
+                        if generation_slots.locked():
+                            await _send_json(websocket, {
+                                "type": "queued",
+                                "position": generation_waiting + 1
                             })
                         
-                        # 发送结束标记
-                        await websocket.send_json({"type": "end"})
+                        generation_waiting += 1
+                        try:
+                            await generation_slots.acquire()
+                        finally:
+                            generation_waiting -= 1
+                        
+                        # 流式响应：生成与发送解耦，发送端每次合并已到达的全部token
+                        token_queue: asyncio.Queue = asyncio.Queue()
+                        drainer = asyncio.create_task(_drain_tokens(websocket, token_queue))
+                        try:
+                            await current.chat_into(content, token_queue.put_nowait)
+                            token_queue.put_nowait(None)
+                            end_sent = await drainer
+                        finally:
+                            drainer.cancel()
+                            generation_slots.release()
+                        
+                        # 发送结束标记（未并入最后一帧时）
+                        if not end_sent:
+                            await websocket.send_text(_END_FRAME)
                         
-                        # 更新状态
-                        status = assistant.get_vehicle_state()
-                        await websocket.send_json({"type": "status", "status": status})
+                        # 更新状态（仅在变化时发送）
+                        status_frame = _status_frame(current.get_vehicle_state())
+                        if status_frame != last_status_frame:
+                            await websocket.send_text(status_frame)
+                            last_status_frame = status_frame
                     else:
-                        await websocket.send_json({
-                            "type": "token",
-                            "content": "助手未初始化"
-                        })
-                        await websocket.send_json({"type": "end"})
+                        await websocket.send_text(_NOT_READY_FRAME)
+                        await websocket.send_text(_END_FRAME)
                 
         except WebSocketDisconnect:
             logger.info("WebSocket disconnected")
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
+    
+    return app
 
-
-def main(model_path: str, host: str = "0.0.0.0", port: int = 8000,
-         n_ctx: int = 4096, n_gpu_layers: int = 35):
-    """主函数"""
+def _load_assistant(model_path: str, n_ctx: int, n_gpu_layers: int):
+    """加载模型（在后台线程运行），完成后才对外提供助手"""
     global assistant
     
-    if not HAS_FASTAPI:
-        print("请安装依赖: pip install fastapi uvicorn")
-        return
-    
-    print(f"正在加载模型: {model_path}")
-    
     try:
-        assistant = CockpitAssistant(
+        loaded = CockpitAssistant(
             model_path=model_path,
             n_ctx=n_ctx,
             n_gpu_layers=n_gpu_layers
@@ -617,26 +278,77 @@ def main(model_path: str, host: str = "0.0.0.0", port: int = 8000,
         print("模型加载成功！")
     except Exception as e:
         print(f"警告: 模型加载失败 ({e})，将使用模拟模式")
-        assistant = CockpitAssistant("mock_model.gguf")
+        loaded = CockpitAssistant("mock_model.gguf")
+    
+    assistant = loaded
+
+
+def main(model_path: str, host: str = "0.0.0.0", port: int = 8000,
+         n_ctx: int = 4096, n_gpu_layers: int = 35, max_concurrent: int = 1):
+    """主函数"""
+    global generation_slots
+    
+    try:
+        import uvicorn
+        app = _make_app()
+    except ImportError:
+        print("请安装依赖: pip install fastapi uvicorn")
+        return
+    
+    # 所有连接共用一个助手（同一份对话历史和KV上下文），并发生成会交错写入历史
+    if max_concurrent > 1:
+        print(f"警告: 所有会话共用一个助手，--max-concurrent={max_concurrent} 会使对话交错，已限制为1")
+    generation_slots = asyncio.Semaphore(1)
+    
+    # 模型在后台加载，服务器先启动；加载完成前对话返回"助手未初始化"
+    print(f"正在加载模型: {model_path}")
+    threading.Thread(
+        target=_load_assistant,
+        args=(model_path, n_ctx, n_gpu_layers),
+        name="model-loader",
+        daemon=True
+    ).start()
     
     print(f"\n启动Web服务器: http://{host}:{port}")
     print("按 Ctrl+C 停止服务器\n")
     
-    uvicorn.run(app, host=host, port=port)
+    uvicorn.run(
+        app,
+        host=host,
+        port=port,
+        loop="uvloop" if HAS_UVLOOP else "asyncio",
+        http="httptools" if HAS_HTTPTOOLS else "h11",
+        # 心跳保持空闲连接，限制单帧大小
+        ws_ping_interval=20,
+        ws_ping_timeout=20,
+        ws_max_size=65536,
+        log_level="warning"
+    )
 
 
-if __name__ == "__main__":
+def _parse_args(argv):
+    """解析命令行参数；只有位置参数时不导入argparse"""
+    default_model = "models/qwen2.5-7b-instruct-q4_k_m.gguf"
+    if not any(arg.startswith("-") for arg in argv) and len(argv) <= 1:
+        return (argv[0] if argv else default_model, "0.0.0.0", 8000, 4096, 35, 1)
+    
+    import argparse
     parser = argparse.ArgumentParser(description="智能座舱助手 - Web演示")
     parser.add_argument(
         "model_path",
         nargs="?",
-        default="models/qwen2.5-7b-instruct-q4_k_m.gguf",
+        default=default_model,
         help="模型文件路径"
     )
     parser.add_argument("--host", default="0.0.0.0", help="服务器地址")
     parser.add_argument("--port", type=int, default=8000, help="服务器端口")
     parser.add_argument("-c", "--ctx", type=int, default=4096, help="上下文长度")
     parser.add_argument("-g", "--gpu-layers", type=int, default=35, help="GPU层数")
+    parser.add_argument("--max-concurrent", type=int, default=1, help="同时生成的最大会话数（所有会话共用一个助手，大于1不安全，会被限制为1）")
     
-    args = parser.parse_args()
-    main(args.model_path, args.host, args.port, args.ctx, args.gpu_layers)
+    args = parser.parse_args(argv)
+    return (args.model_path, args.host, args.port, args.ctx, args.gpu_layers, args.max_concurrent)
+
+
+if __name__ == "__main__":
+    main(*_parse_args(sys.argv[1:]))
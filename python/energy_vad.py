@@ -0,0 +1,69 @@
+"""
+Energy VAD - 基于能量的语音活动检测
+
+对int16 PCM逐帧计算平均能量，与噪声标定出的阈值比较，用于录音端点检测。
+安装numba时热点循环编译为机器码，否则使用NumPy向量化实现（einsum逐帧点积）。
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# 阈值下限（帧平均能量，约-50dBFS），避免静音环境下标定出过低的阈值
+MIN_THRESHOLD = 1.0e4
+
+# 能量超过阈值该倍数的帧直接判为语音，介于两者之间的帧属于模糊区间
+AMBIGUOUS_RATIO = 4.0
+
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def frame_energy(pcm: np.ndarray) -> float:
+        """单帧平均能量"""
+        s = 0.0
+        for x in pcm:
+            s += float(x) * float(x)
+        return s / pcm.shape[0]
+
+    @njit(cache=True, fastmath=True)
+    def frame_energies(pcm: np.ndarray, frame_len: int) -> np.ndarray:
+        """逐帧平均能量（不足一帧的尾部忽略）"""
+        n = pcm.shape[0] // frame_len
+        out = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            out[i] = frame_energy(pcm[i * frame_len:(i + 1) * frame_len])
+        return out
+
+else:
+    def frame_energy(pcm: np.ndarray) -> float:
+        """单帧平均能量"""
+        x = pcm.astype(np.float64)
+        return float(np.dot(x, x)) / len(x)
+
+    def frame_energies(pcm: np.ndarray, frame_len: int) -> np.ndarray:
+        """逐帧平均能量（不足一帧的尾部忽略）"""
+        n = len(pcm) // frame_len
+        frames = pcm[:n * frame_len].reshape(n, frame_len)
+        # int16点积在int64中累加，不产生中间数组
+        return np.einsum("ij,ij->i", frames, frames, dtype=np.int64) / frame_len
+
+
+def calibrate_threshold(noise: np.ndarray, frame_len: int, factor: float = 3.0) -> float:
+    """
+    根据背景噪声标定语音能量阈值（取帧能量的10%分位数，不受开头少量语音影响）
+
+    Args:
+        noise: 开始录音后的一段背景音（int16）
+        frame_len: 帧长（采样点数）
+        factor: 阈值相对噪声能量的倍数
+
+    Returns:
+        帧平均能量阈值
+    """
+    if len(noise) < frame_len:
+        return MIN_THRESHOLD
+    return max(float(np.percentile(frame_energies(noise, frame_len), 10)) * factor, MIN_THRESHOLD)
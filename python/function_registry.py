@@ -4,31 +4,185 @@ Function Registry - 车辆控制函数定义
 定义智能座舱助手可调用的所有函数及其参数schema
 """
 
+import functools
 import json
-from typing import Dict, Any, List, Optional
+import math
+import sys
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 
-@dataclass
+# orjson可选，用于加速schema序列化
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+def _to_integer(value):
+    """integer参数：接受整数、整数值的浮点数和数字字符串（如"2"、2.0）"""
+    t = type(value)
+    if t is int:
+        return value
+    if t is str:
+        value = float(value)
+        t = float
+    if t is float and value.is_integer():
+        return int(value)
+    raise ValueError(value)
+
+
+def _to_number(value):
+    """number参数：接受整数、浮点数和数字字符串（如"26"、"26.5"）"""
+    t = type(value)
+    if t is int or t is float:
+        return value
+    if t is str:
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+            if math.isfinite(value):
+                return value
+    raise ValueError(value)
+
+
+def _to_string(value):
+    """string参数：数字转为字符串（如未加引号的电话号码）"""
+    t = type(value)
+    if t is str:
+        return value
+    if t is int or t is float:
+        return str(value)
+    raise ValueError(value)
+
+
+def _exact(*types):
+    """按type()精确匹配，不做转换（bool不会被当作int）"""
+    def check(value):
+        if type(value) in types:
+            return value
+        raise ValueError(value)
+    return check
+
+
+# JSON Schema类型对应的转换函数：返回转换后的值，无法转换时抛出ValueError
+_TYPE_COERCERS: Dict[str, Callable[[Any], Any]] = {
+    "string": _to_string,
+    "integer": _to_integer,
+    "number": _to_number,
+    "boolean": _exact(bool),
+    "array": _exact(list, tuple),
+    "object": _exact(dict),
+}
+
+@dataclass(frozen=True, slots=True)
 class FunctionParameter:
-    """函数参数定义"""
+    """函数参数定义（不可变，可作为缓存键）"""
     name: str
     type: str
     description: str
     required: bool = False
-    enum: Optional[List[str]] = None
+    enum: Optional[Tuple[str, ...]] = None
     minimum: Optional[float] = None
     maximum: Optional[float] = None
     default: Any = None
+    
+    def __post_init__(self):
+        # 驻留名称与枚举值，与驻留后的参数值比较时可直接命中同一对象；
+        # 枚举传入列表时转为元组
+        object.__setattr__(self, "name", sys.intern(self.name))
+        object.__setattr__(self, "type", sys.intern(self.type))
+        if self.enum:
+            object.__setattr__(self, "enum", tuple(sys.intern(v) for v in self.enum))
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FunctionDefinition:
-    """函数定义"""
+    """函数定义（不可变，可作为缓存键）"""
     name: str
     description: str
-    parameters: List[FunctionParameter] = field(default_factory=list)
+    parameters: Tuple[FunctionParameter, ...] = ()
+    # to_schema()结果缓存
+    _schema_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    # 参数索引与校验函数，构造时一次性建立
+    _by_name: Dict[str, FunctionParameter] = field(init=False, repr=False, compare=False)
+    _required: tuple = field(init=False, repr=False, compare=False)
+    _enum_names: tuple = field(init=False, repr=False, compare=False)
+    validator: Callable[[Dict[str, Any]], Optional[str]] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # 冻结实例只能经object.__setattr__写入；参数传入列表时转为元组
+        setattr_ = object.__setattr__
+        params = tuple(self.parameters)
+        setattr_(self, "parameters", params)
+        setattr_(self, "_by_name", {p.name: p for p in params})
+        setattr_(self, "_required", tuple(p.name for p in params if p.required))
+        setattr_(self, "_enum_names", tuple(p.name for p in params if p.enum))
+        setattr_(self, "validator", self.compile_validator())
+    
+    def get_param(self, name: str) -> Optional[FunctionParameter]:
+        """按名称获取参数定义"""
+        return self._by_name.get(name)
+    
+    def required_names(self) -> tuple:
+        """必需参数名"""
+        return self._required
+    
+    def enum_param_names(self) -> tuple:
+        """取值为枚举的参数名"""
+        return self._enum_names
+    
+    def compile_validator(self) -> Callable[[Dict[str, Any]], Optional[str]]:
+        """
+        生成本函数专用的参数校验闭包
+        
+        必需参数、参数类型、枚举取值和数值范围在生成时即展开成元组，
+        调用时不再遍历参数定义。数字字符串、整数值的浮点数等可无损转换的
+        取值会被转换为声明的类型并写回args。
+        
+        Returns:
+            校验函数：参数合法返回None，否则返回错误描述
+        """
+        required = self._required
+        coercers = tuple(
+            (p.name, _TYPE_COERCERS[p.type]) for p in self.parameters if p.type in _TYPE_COERCERS
+        )
+        enums = tuple((p.name, frozenset(p.enum)) for p in self.parameters if p.enum)
+        bounds = tuple(
+            (p.name, p.minimum, p.maximum) for p in self.parameters
+            if p.minimum is not None or p.maximum is not None
+        )
+        
+        def validate(args: Dict[str, Any]) -> Optional[str]:
+            for name in required:
+                # 必需参数为null视同缺失
+                if args.get(name) is None:
+                    return f"缺少参数: {name}"
+            for name, coerce in coercers:
+                value = args.get(name)
+                if value is not None:
+                    try:
+                        args[name] = coerce(value)
+                    except (ValueError, OverflowError):
+                        return f"参数类型无效: {name}={value!r}"
+            for name, allowed in enums:
+                value = args.get(name)
+                if value is not None and (type(value) is not str or value not in allowed):
+                    return f"参数取值无效: {name}={value}"
+            for name, low, high in bounds:
+                value = args.get(name)
+                # 类型已校验并转换，数值参数只可能是int或float
+                if value is not None:
+                    if (low is not None and value < low) or (high is not None and value > high):
+                        return f"参数超出范围: {name}={value}"
+            return None
+        
+        return validate
     
     def to_schema(self) -> Dict[str, Any]:
-        """转换为JSON Schema格式"""
+        """转换为JSON Schema格式（结果会被缓存复用，调用方请勿修改）"""
+        if self._schema_cache is not None:
+            return self._schema_cache
+        
         properties = {}
         required = []
         
@@ -38,7 +192,7 @@ class FunctionDefinition:
                 "description": param.description
             }
             if param.enum:
-                prop["enum"] = param.enum
+                prop["enum"] = list(param.enum)
             if param.minimum is not None:
                 prop["minimum"] = param.minimum
             if param.maximum is not None:
@@ -49,7 +203,7 @@ class FunctionDefinition:
             if param.required:
                 required.append(param.name)
         
-        return {
+        schema = {
             "name": self.name,
             "description": self.description,
             "parameters": {
@@ -58,6 +212,8 @@ class FunctionDefinition:
                 "required": required
             }
         }
+        object.__setattr__(self, "_schema_cache", schema)
+        return schema
 
 
 class FunctionRegistry:
@@ -65,6 +221,10 @@ class FunctionRegistry:
     
     def __init__(self):
         self.functions: Dict[str, FunctionDefinition] = {}
+        # 派生结果缓存，register()时失效
+        self._schemas_cache: Optional[List[Dict[str, Any]]] = None
+        self._json_cache: Optional[str] = None
+        self._prompt_cache: Optional[str] = None
         self._register_default_functions()
     
     def _register_default_functions(self):
@@ -180,7 +340,7 @@ class FunctionRegistry:
                     name="action",
                     type="string",
                     description="播放操作",
-                    enum=["play", "pause", "stop", "next", "previous", "shuffle", "repeat"]
+                    enum=["play", "pause", "stop", "next", "previous", "shuffle", "repeat", "volume"]
                 ),
                 FunctionParameter(
                     name="volume",
@@ -320,6 +480,9 @@ class FunctionRegistry:
     def register(self, func_def: FunctionDefinition):
         """注册函数"""
         self.functions[func_def.name] = func_def
+        self._schemas_cache = None
+        self._json_cache = None
+        self._prompt_cache = None
     
     def get(self, name: str) -> Optional[FunctionDefinition]:
         """获取函数定义"""
@@ -327,32 +490,51 @@ class FunctionRegistry:
     
     def get_all_schemas(self) -> List[Dict[str, Any]]:
         """获取所有函数的schema"""
-        return [f.to_schema() for f in self.functions.values()]
+        if self._schemas_cache is None:
+            self._schemas_cache = [f.to_schema() for f in self.functions.values()]
+        return self._schemas_cache
     
     def to_json_schema(self) -> str:
         """生成完整的JSON schema字符串"""
-        return json.dumps({
-            "functions": self.get_all_schemas()
-        }, ensure_ascii=False, indent=2)
+        if self._json_cache is None:
+            data = {"functions": self.get_all_schemas()}
+            if HAS_ORJSON:
+                self._json_cache = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+            else:
+                self._json_cache = json.dumps(data, ensure_ascii=False, indent=2)
+        return self._json_cache
     
     def get_system_prompt_functions(self) -> str:
         """生成用于系统提示词的函数说明"""
-        lines = ["可用的函数："]
-        for func in self.functions.values():
-            params = []
-            for p in func.parameters:
-                param_str = f"{p.name}: {p.type}"
-                if p.enum:
-                    param_str += f" ({'/'.join(p.enum)})"
-                if p.required:
-                    param_str += " [必需]"
-                params.append(param_str)
-            
-            lines.append(f"- {func.name}: {func.description}")
-            if params:
-                lines.append(f"  参数: {', '.join(params)}")
+        if self._prompt_cache is not None:
+            return self._prompt_cache
         
-        return "\n".join(lines)
+        # 每个函数的说明按内容缓存，注册新函数后只需格式化新增的部分
+        self._prompt_cache = "可用的函数：" + "".join(
+            _format_function_entry(
+                func.name,
+                func.description,
+                tuple((p.name, p.type, p.enum or (), p.required)
+                      for p in func.parameters)
+            )
+            for func in self.functions.values()
+        )
+        return self._prompt_cache
+
+
+@functools.lru_cache(maxsize=64)
+def _format_function_entry(name: str, description: str, params: tuple) -> str:
+    """格式化单个函数的说明，params为(名称, 类型, 枚举值, 是否必需)元组"""
+    parts = ["\n- ", name, ": ", description]
+    sep = "\n  参数: "
+    for p_name, p_type, p_enum, p_required in params:
+        parts += (sep, p_name, ": ", p_type)
+        if p_enum:
+            parts += (" (", "/".join(p_enum), ")")
+        if p_required:
+            parts.append(" [必需]")
+        sep = ", "
+    return "".join(parts)
 
 
 # 创建默认注册表实例
@@ -7,13 +7,65 @@ Vehicle Controller - 车辆控制器
 
 import asyncio
 import json
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, Callable, Awaitable
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Callable, ClassVar, Mapping, Tuple
 from datetime import datetime
 import random
 
+from function_registry import FunctionDefinition, FunctionRegistry, default_registry
 
-@dataclass
+
+# 显示名称对照表
+_WINDOW_POSITION_NAMES = MappingProxyType({
+    "front_left": "左前",
+    "front_right": "右前",
+    "rear_left": "左后",
+    "rear_right": "右后",
+    "all": "全部"
+})
+
+_WINDOW_ACTION_NAMES = MappingProxyType({
+    "open": "打开",
+    "close": "关闭",
+    "half_open": "半开"
+})
+
+# 座椅档位类功能 -> 显示名称
+_SEAT_LEVEL_FUNCTIONS = MappingProxyType({
+    "heating": "加热",
+    "cooling": "通风",
+    "massage": "按摩"
+})
+
+_LIGHT_NAMES = MappingProxyType({
+    "headlight": "大灯",
+    "highbeam": "远光灯",
+    "fog": "雾灯",
+    "interior": "内饰灯",
+    "hazard": "双闪",
+    "turn_left": "左转向灯",
+    "turn_right": "右转向灯"
+})
+
+
+# 完整状态报告模板
+_ALL_STATUS_TEMPLATE = (
+    "📊 车辆状态报告\n"
+    "🔋 电池电量: {battery}%，剩余续航约{range}公里\n"
+    "🛞 {tire_pressure}\n"
+    "🛢️ 机油寿命: {oil}%，状态良好\n"
+    "📍 总里程: {mileage:,}公里\n"
+    "🌡️ 车内温度: {interior}°C，车外温度: {exterior}°C"
+)
+
+# 模拟天气数据
+_WEATHER_CONDITIONS = ("晴", "多云", "阴", "小雨")
+_WEATHER_WINDS = ("微风", "东风3级", "西北风4级")
+
+
+@dataclass(slots=True)
 class AirConditionerState:
     """空调状态"""
     is_on: bool = False
@@ -22,7 +74,7 @@ class AirConditionerState:
     mode: str = "auto"
 
 
-@dataclass
+@dataclass(slots=True)
 class WindowState:
     """车窗状态"""
     front_left: str = "closed"      # closed, open, half_open
@@ -31,7 +83,15 @@ class WindowState:
     rear_right: str = "closed"
     
     def get_position(self, position: str) -> str:
-        return getattr(self, position, "closed")
+        if position == "front_left":
+            return self.front_left
+        if position == "front_right":
+            return self.front_right
+        if position == "rear_left":
+            return self.rear_left
+        if position == "rear_right":
+            return self.rear_right
+        return "closed"
     
     def set_position(self, position: str, state: str):
         if position == "all":
@@ -39,11 +99,19 @@ class WindowState:
             self.front_right = state
             self.rear_left = state
             self.rear_right = state
+        elif position == "front_left":
+            self.front_left = state
+        elif position == "front_right":
+            self.front_right = state
+        elif position == "rear_left":
+            self.rear_left = state
+        elif position == "rear_right":
+            self.rear_right = state
         else:
-            setattr(self, position, state)
+            raise ValueError(f"未知的车窗位置: {position}")
 
 
-@dataclass
+@dataclass(slots=True)
 class SeatState:
     """座椅状态"""
     heating: int = 0        # 0-3
@@ -52,7 +120,7 @@ class SeatState:
     memory_slot: int = 0    # 1-3, 0表示未设置
 
 
-@dataclass
+@dataclass(slots=True)
 class LightState:
     """灯光状态"""
     headlight: str = "off"   # on, off, auto
@@ -62,7 +130,7 @@ class LightState:
     hazard: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class VehicleState:
     """车辆完整状态"""
     # 空调
@@ -95,12 +163,8 @@ class VehicleState:
     # 车辆信息
     battery_percentage: int = 78
     estimated_range: int = 320     # km
-    tire_pressure: Dict[str, float] = field(default_factory=lambda: {
-        "front_left": 2.4,
-        "front_right": 2.4,
-        "rear_left": 2.3,
-        "rear_right": 2.3
-    })
+    # 胎压(bar)，顺序: 左前, 右前, 左后, 右后
+    tire_pressure: Tuple[float, float, float, float] = (2.4, 2.4, 2.3, 2.3)
     oil_life: int = 85             # %
     total_mileage: int = 15680     # km
     interior_temperature: float = 25.0
@@ -114,20 +178,29 @@ class VehicleController:
     处理所有车辆控制相关的函数调用
     """
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, registry: Optional[FunctionRegistry] = None):
         self.state = VehicleState()
-        self._handlers: Dict[str, Callable[..., Awaitable[str]]] = {
-            "control_air_conditioner": self._handle_ac,
-            "control_window": self._handle_window,
-            "navigate_to": self._handle_navigation,
-            "play_music": self._handle_music,
-            "get_vehicle_status": self._handle_status_query,
-            "control_lights": self._handle_lights,
-            "control_seat": self._handle_seat,
-            "make_phone_call": self._handle_phone,
-            "get_weather": self._handle_weather,
+        
+        # 函数定义（用于参数校验与处理）
+        self._registry = registry if registry is not None else default_registry
+        
+        # 模拟数据的随机数源（独立实例，可指定种子复现）
+        self._random = random.Random(seed).random
+        
+        # 状态摘要（结构固定，get_state_summary()原地更新后返回）
+        self._summary: Dict[str, Any] = {
+            "ac": {"on": False, "temperature": 0.0, "fan_speed": 0},
+            "windows": {"front_left": "", "front_right": "", "rear_left": "", "rear_right": ""},
+            "navigation": {"active": False, "destination": None},
+            "music": {"playing": False, "track": "", "volume": 0},
+            "battery": 0,
+            "range": 0
         }
         
+        # 胎压文本缓存（以胎压元组为键）
+        self._tire_pressure_key: Optional[tuple] = None
+        self._tire_pressure_text = ""
+        
         # 事件回调（用于UI更新等）
         self.on_state_changed: Optional[Callable[[str, Any], None]] = None
     
@@ -142,15 +215,58 @@ class VehicleController:
         Returns:
             执行结果的文本描述
         """
-        handler = self._handlers.get(function_name)
-        if handler:
-            try:
-                result = await handler(arguments)
-                self._notify_state_changed(function_name, arguments)
-                return result
-            except Exception as e:
-                return f"执行失败: {str(e)}"
-        return f"未知的控制指令: {function_name}"
+        # 函数名分派到处理方法（处理方法除导航外均为同步函数）
+        match function_name:
+            case "control_air_conditioner":
+                handler = self._handle_ac
+            case "control_window":
+                handler = self._handle_window
+            case "navigate_to":
+                handler = self._handle_navigation
+            case "play_music":
+                handler = self._handle_music
+            case "get_vehicle_status":
+                handler = self._handle_status_query
+            case "control_lights":
+                handler = self._handle_lights
+            case "control_seat":
+                handler = self._handle_seat
+            case "make_phone_call":
+                handler = self._handle_phone
+            case "get_weather":
+                handler = self._handle_weather
+            case _:
+                return f"未知的控制指令: {function_name}"
+        
+        func_def = self._registry.get(function_name)
+        if func_def is not None:
+            error = func_def.validator(arguments)
+            if error is not None:
+                return error
+            self._intern_enum_args(func_def, arguments)
+        
+        # 参数的类型、取值和范围已通过校验（见compile_validator），同步处理函数不会抛出异常；
+        # 导航自行处理异常
+        result = handler(arguments)
+        if asyncio.iscoroutine(result):
+            result = await result
+        self._notify_state_changed(function_name, arguments)
+        return result
+    
+    @staticmethod
+    def _intern_enum_args(func_def: FunctionDefinition, arguments: Dict[str, Any]):
+        """驻留枚举参数的取值，使处理函数中的字符串比较走同一对象的快速路径"""
+        for name in func_def.enum_param_names():
+            value = arguments.get(name)
+            if type(value) is str:
+                arguments[name] = sys.intern(value)
+    
+    def _randint(self, low: int, high: int) -> int:
+        """[low, high]内的随机整数（单次C调用，比random.randint开销小）"""
+        return low + int(self._random() * (high - low + 1))
+    
+    def _choice(self, seq):
+        return seq[int(self._random() * len(seq))]
     
     def _notify_state_changed(self, function_name: str, arguments: Dict[str, Any]):
         """通知状态变更"""
@@ -161,73 +277,64 @@ class VehicleController:
     # 处理函数
     # =========================================================================
     
-    async def _handle_ac(self, args: Dict[str, Any]) -> str:
+    def _handle_ac(self, args: Dict[str, Any]) -> str:
         """处理空调控制"""
-        action = args.get("action", "")
+        fn = self._AC_ACTIONS.get(args.get("action", ""))
+        return fn(self, args) if fn else "未知的空调操作"
+    
+    def _ac_on(self, args: Dict[str, Any]) -> str:
+        self.state.ac.is_on = True
+        temp = args.get("temperature", 24)
+        fan = args.get("fan_speed", 3)
+        mode = args.get("mode", "auto")
         
-        if action == "on":
-            self.state.ac.is_on = True
-            temp = args.get("temperature", 24)
-            fan = args.get("fan_speed", 3)
-            mode = args.get("mode", "auto")
-            
+        self.state.ac.temperature = temp
+        self.state.ac.fan_speed = fan
+        self.state.ac.mode = mode
+        
+        return f"已打开空调，温度设置为{temp}°C，风量{fan}档，{mode}模式"
+    
+    def _ac_off(self, args: Dict[str, Any]) -> str:
+        self.state.ac.is_on = False
+        return "已关闭空调"
+    
+    def _ac_adjust(self, args: Dict[str, Any]) -> str:
+        changes = []
+        
+        if "temperature" in args:
+            temp = args["temperature"]
             self.state.ac.temperature = temp
+            changes.append(f"温度{temp}°C")
+        
+        if "fan_speed" in args:
+            fan = args["fan_speed"]
             self.state.ac.fan_speed = fan
+            changes.append(f"风量{fan}档")
+        
+        if "mode" in args:
+            mode = args["mode"]
             self.state.ac.mode = mode
-            
-            return f"已打开空调，温度设置为{temp}°C，风量{fan}档，{mode}模式"
-            
-        elif action == "off":
-            self.state.ac.is_on = False
-            return "已关闭空调"
-            
-        elif action == "adjust":
-            changes = []
-            
-            if "temperature" in args:
-                temp = args["temperature"]
-                self.state.ac.temperature = temp
-                changes.append(f"温度{temp}°C")
-            
-            if "fan_speed" in args:
-                fan = args["fan_speed"]
-                self.state.ac.fan_speed = fan
-                changes.append(f"风量{fan}档")
-            
-            if "mode" in args:
-                mode = args["mode"]
-                self.state.ac.mode = mode
-                changes.append(f"{mode}模式")
-            
-            if changes:
-                return f"已调整空调: {', '.join(changes)}"
-            return "请指定需要调整的参数"
+            changes.append(f"{mode}模式")
         
-        return "未知的空调操作"
+        if changes:
+            return f"已调整空调: {', '.join(changes)}"
+        return "请指定需要调整的参数"
+    
+    _AC_ACTIONS: ClassVar[Mapping[str, Callable]] = MappingProxyType({
+        "on": _ac_on,
+        "off": _ac_off,
+        "adjust": _ac_adjust,
+    })
     
-    async def _handle_window(self, args: Dict[str, Any]) -> str:
+    def _handle_window(self, args: Dict[str, Any]) -> str:
         """处理车窗控制"""
         position = args.get("position", "")
         action = args.get("action", "")
         
-        position_names = {
-            "front_left": "左前",
-            "front_right": "右前",
-            "rear_left": "左后",
-            "rear_right": "右后",
-            "all": "全部"
-        }
-        
-        action_names = {
-            "open": "打开",
-            "close": "关闭",
-            "half_open": "半开"
-        }
-        
         self.state.windows.set_position(position, action)
         
-        pos_name = position_names.get(position, position)
-        act_name = action_names.get(action, action)
+        pos_name = _WINDOW_POSITION_NAMES.get(position, position)
+        act_name = _WINDOW_ACTION_NAMES.get(action, action)
         
         return f"已{act_name}{pos_name}车窗"
     
@@ -243,24 +350,24 @@ class VehicleController:
         self.state.destination = destination
         self.state.navigation_active = True
         
-        # 模拟计算路线
-        await asyncio.sleep(0.5)
-        
-        # 生成模拟信息
-        distance = random.randint(5, 50)
-        time_mins = distance * random.randint(2, 4)
-        
-        result = f"正在为您导航至{destination}"
-        if via_points:
-            result += f"，途经{', '.join(via_points)}"
-        result += f"\n预计距离{distance}公里，约需{time_mins}分钟"
+        try:
+            # 模拟计算路线
+            await asyncio.sleep(0.5)
+            
+            # 生成模拟信息
+            distance = self._randint(5, 50)
+            time_mins = distance * self._randint(2, 4)
+            
+            via = f"，途经{', '.join(via_points)}" if via_points else ""
+        except Exception as e:
+            return f"执行失败: {str(e)}"
         
-        return result
+        # 一次格式化出完整结果，不做逐段拼接
+        return f"正在为您导航至{destination}{via}\n预计距离{distance}公里，约需{time_mins}分钟"
     
-    async def _handle_music(self, args: Dict[str, Any]) -> str:
+    def _handle_music(self, args: Dict[str, Any]) -> str:
         """处理音乐控制"""
         action = args.get("action", "play")
-        query = args.get("query", "")
         volume = args.get("volume")
         
         if volume is not None:
@@ -268,74 +375,95 @@ class VehicleController:
             if action == "volume":
                 return f"音量已调整至{volume}"
         
-        if action == "play":
-            if query:
-                self.state.music_playing = True
-                self.state.current_track = query
-                return f"正在播放: {query}"
-            elif self.state.current_track:
-                self.state.music_playing = True
-                return "继续播放"
-            else:
-                return "请告诉我您想听什么"
-                
-        elif action == "pause":
-            self.state.music_playing = False
-            return "音乐已暂停"
-            
-        elif action == "stop":
-            self.state.music_playing = False
-            self.state.current_track = ""
-            return "已停止播放"
-            
-        elif action == "next":
-            # 模拟下一首
-            self.state.current_track = "下一首歌曲"
-            return "已切换到下一首"
-            
-        elif action == "previous":
-            self.state.current_track = "上一首歌曲"
-            return "已切换到上一首"
-            
-        elif action == "shuffle":
-            return "已开启随机播放"
-            
-        elif action == "repeat":
-            return "已开启单曲循环"
-        
-        return "已执行音乐操作"
+        fn = self._MUSIC_ACTIONS.get(action)
+        return fn(self, args) if fn else "已执行音乐操作"
+    
+    def _music_play(self, args: Dict[str, Any]) -> str:
+        query = args.get("query", "")
+        if query:
+            self.state.music_playing = True
+            self.state.current_track = query
+            return f"正在播放: {query}"
+        elif self.state.current_track:
+            self.state.music_playing = True
+            return "继续播放"
+        return "请告诉我您想听什么"
     
-    async def _handle_status_query(self, args: Dict[str, Any]) -> str:
-        """处理状态查询"""
+    def _music_pause(self, args: Dict[str, Any]) -> str:
+        self.state.music_playing = False
+        return "音乐已暂停"
+    
+    def _music_stop(self, args: Dict[str, Any]) -> str:
+        self.state.music_playing = False
+        self.state.current_track = ""
+        return "已停止播放"
+    
+    def _music_next(self, args: Dict[str, Any]) -> str:
+        # 模拟下一首
+        self.state.current_track = "下一首歌曲"
+        return "已切换到下一首"
+    
+    def _music_previous(self, args: Dict[str, Any]) -> str:
+        self.state.current_track = "上一首歌曲"
+        return "已切换到上一首"
+    
+    def _music_shuffle(self, args: Dict[str, Any]) -> str:
+        return "已开启随机播放"
+    
+    def _music_repeat(self, args: Dict[str, Any]) -> str:
+        return "已开启单曲循环"
+    
+    _MUSIC_ACTIONS: ClassVar[Mapping[str, Callable]] = MappingProxyType({
+        "play": _music_play,
+        "pause": _music_pause,
+        "stop": _music_stop,
+        "next": _music_next,
+        "previous": _music_previous,
+        "shuffle": _music_shuffle,
+        "repeat": _music_repeat,
+    })
+    
+    def _handle_status_query(self, args: Dict[str, Any]) -> str:
+        """处理状态查询（只格式化所查询的项）"""
         info_type = args.get("info_type", "all")
-        
-        status_info = {
-            "battery": f"电池电量: {self.state.battery_percentage}%，剩余续航约{self.state.estimated_range}公里",
-            "tire_pressure": self._format_tire_pressure(),
-            "oil": f"机油寿命: {self.state.oil_life}%，状态良好",
-            "mileage": f"总里程: {self.state.total_mileage:,}公里",
-            "temperature": f"车内温度: {self.state.interior_temperature}°C，车外温度: {self.state.exterior_temperature}°C",
-            "doors": "所有车门已锁定",
-            "lights": self._format_lights_status(),
-        }
+        state = self.state
         
         if info_type == "all":
-            return "\n".join([
-                "📊 车辆状态报告",
-                f"🔋 {status_info['battery']}",
-                f"🛞 {status_info['tire_pressure']}",
-                f"🛢️ {status_info['oil']}",
-                f"📍 {status_info['mileage']}",
-                f"🌡️ {status_info['temperature']}",
-            ])
-        
-        return status_info.get(info_type, f"未知的查询类型: {info_type}")
+            return _ALL_STATUS_TEMPLATE.format_map({
+                "battery": state.battery_percentage,
+                "range": state.estimated_range,
+                "tire_pressure": self._format_tire_pressure(),
+                "oil": state.oil_life,
+                "mileage": state.total_mileage,
+                "interior": state.interior_temperature,
+                "exterior": state.exterior_temperature,
+            })
+        elif info_type == "battery":
+            return f"电池电量: {state.battery_percentage}%，剩余续航约{state.estimated_range}公里"
+        elif info_type == "tire_pressure":
+            return self._format_tire_pressure()
+        elif info_type == "oil":
+            return f"机油寿命: {state.oil_life}%，状态良好"
+        elif info_type == "mileage":
+            return f"总里程: {state.total_mileage:,}公里"
+        elif info_type == "temperature":
+            return f"车内温度: {state.interior_temperature}°C，车外温度: {state.exterior_temperature}°C"
+        elif info_type == "doors":
+            return "所有车门已锁定"
+        elif info_type == "lights":
+            return self._format_lights_status()
+        
+        return f"未知的查询类型: {info_type}"
     
     def _format_tire_pressure(self) -> str:
-        """格式化胎压信息"""
+        """格式化胎压信息（胎压未变化时复用上次结果）"""
         tp = self.state.tire_pressure
-        return (f"胎压正常 - 左前:{tp['front_left']}bar 右前:{tp['front_right']}bar "
-                f"左后:{tp['rear_left']}bar 右后:{tp['rear_right']}bar")
+        if tp != self._tire_pressure_key:
+            self._tire_pressure_key = tp
+            self._tire_pressure_text = (
+                f"胎压正常 - 左前:{tp[0]}bar 右前:{tp[1]}bar "
+                f"左后:{tp[2]}bar 右后:{tp[3]}bar")
+        return self._tire_pressure_text
     
     def _format_lights_status(self) -> str:
         """格式化灯光状态"""
@@ -352,22 +480,12 @@ class VehicleController:
         
         return "灯光: " + (", ".join(status) if status else "全部关闭")
     
-    async def _handle_lights(self, args: Dict[str, Any]) -> str:
+    def _handle_lights(self, args: Dict[str, Any]) -> str:
         """处理灯光控制"""
         light_type = args.get("light_type", "")
         action = args.get("action", "")
         brightness = args.get("brightness")
         
-        light_names = {
-            "headlight": "大灯",
-            "highbeam": "远光灯",
-            "fog": "雾灯",
-            "interior": "内饰灯",
-            "hazard": "双闪",
-            "turn_left": "左转向灯",
-            "turn_right": "右转向灯"
-        }
-        
         if light_type == "headlight":
             self.state.lights.headlight = action
         elif light_type == "highbeam":
@@ -382,12 +500,12 @@ class VehicleController:
         elif light_type == "hazard":
             self.state.lights.hazard = (action == "on")
         
-        name = light_names.get(light_type, light_type)
+        name = _LIGHT_NAMES.get(light_type, light_type)
         action_text = "打开" if action == "on" else ("关闭" if action == "off" else "自动")
         
         return f"已{action_text}{name}"
     
-    async def _handle_seat(self, args: Dict[str, Any]) -> str:
+    def _handle_seat(self, args: Dict[str, Any]) -> str:
         """处理座椅控制"""
         seat = args.get("seat", "driver")
         function = args.get("function", "")
@@ -397,65 +515,64 @@ class VehicleController:
         seat_state = self.state.driver_seat if seat == "driver" else self.state.passenger_seat
         seat_name = "主驾" if seat == "driver" else "副驾"
         
-        if function == "heating":
-            seat_state.heating = level
-            return f"{seat_name}座椅加热已设置为{level}档" if level > 0 else f"已关闭{seat_name}座椅加热"
-            
-        elif function == "cooling":
-            seat_state.cooling = level
-            return f"{seat_name}座椅通风已设置为{level}档" if level > 0 else f"已关闭{seat_name}座椅通风"
-            
-        elif function == "massage":
-            seat_state.massage = level
-            return f"{seat_name}座椅按摩已设置为{level}档" if level > 0 else f"已关闭{seat_name}座椅按摩"
-            
-        elif function == "memory":
-            if memory_slot:
-                seat_state.memory_slot = memory_slot
-                return f"已恢复{seat_name}座椅记忆位置{memory_slot}"
+        label = _SEAT_LEVEL_FUNCTIONS.get(function)
+        if label:
+            setattr(seat_state, function, level)
+            return f"{seat_name}座椅{label}已设置为{level}档" if level > 0 else f"已关闭{seat_name}座椅{label}"
+        
+        if function == "memory" and memory_slot:
+            seat_state.memory_slot = memory_slot
+            return f"已恢复{seat_name}座椅记忆位置{memory_slot}"
         
         return f"已调整{seat_name}座椅"
     
-    async def _handle_phone(self, args: Dict[str, Any]) -> str:
+    def _handle_phone(self, args: Dict[str, Any]) -> str:
         """处理电话控制"""
-        action = args.get("action", "")
+        fn = self._PHONE_ACTIONS.get(args.get("action", ""))
+        return fn(self, args) if fn else "已执行电话操作"
+    
+    def _phone_call(self, args: Dict[str, Any]) -> str:
         contact = args.get("contact", "")
-        
-        if action == "call":
-            if not contact:
-                return "请告诉我您要拨打给谁"
-            self.state.call_active = True
-            self.state.current_contact = contact
-            return f"正在拨打{contact}..."
-            
-        elif action == "answer":
-            self.state.call_active = True
-            return "已接听来电"
-            
-        elif action == "hangup":
-            self.state.call_active = False
-            self.state.current_contact = ""
-            return "已挂断电话"
-            
-        elif action == "reject":
-            return "已拒绝来电"
-            
-        elif action == "mute":
-            return "已静音"
-        
-        return "已执行电话操作"
+        if not contact:
+            return "请告诉我您要拨打给谁"
+        self.state.call_active = True
+        self.state.current_contact = contact
+        return f"正在拨打{contact}..."
+    
+    def _phone_answer(self, args: Dict[str, Any]) -> str:
+        self.state.call_active = True
+        return "已接听来电"
+    
+    def _phone_hangup(self, args: Dict[str, Any]) -> str:
+        self.state.call_active = False
+        self.state.current_contact = ""
+        return "已挂断电话"
     
-    async def _handle_weather(self, args: Dict[str, Any]) -> str:
+    def _phone_reject(self, args: Dict[str, Any]) -> str:
+        return "已拒绝来电"
+    
+    def _phone_mute(self, args: Dict[str, Any]) -> str:
+        return "已静音"
+    
+    _PHONE_ACTIONS: ClassVar[Mapping[str, Callable]] = MappingProxyType({
+        "call": _phone_call,
+        "answer": _phone_answer,
+        "hangup": _phone_hangup,
+        "reject": _phone_reject,
+        "mute": _phone_mute,
+    })
+    
+    def _handle_weather(self, args: Dict[str, Any]) -> str:
         """处理天气查询"""
         location = args.get("location", "当前位置")
         query_type = args.get("type", "current")
         
         # 模拟天气数据
         weather_data = {
-            "condition": random.choice(["晴", "多云", "阴", "小雨"]),
-            "temperature": random.randint(15, 35),
-            "humidity": random.randint(40, 80),
-            "wind": random.choice(["微风", "东风3级", "西北风4级"]),
+            "condition": self._choice(_WEATHER_CONDITIONS),
+            "temperature": self._randint(15, 35),
+            "humidity": self._randint(40, 80),
+            "wind": self._choice(_WEATHER_WINDS),
         }
         
         if query_type == "current":
@@ -473,31 +590,38 @@ class VehicleController:
     # =========================================================================
     
     def get_state_summary(self) -> Dict[str, Any]:
-        """获取状态摘要"""
-        return {
-            "ac": {
-                "on": self.state.ac.is_on,
-                "temperature": self.state.ac.temperature,
-                "fan_speed": self.state.ac.fan_speed
-            },
-            "windows": {
-                "front_left": self.state.windows.front_left,
-                "front_right": self.state.windows.front_right,
-                "rear_left": self.state.windows.rear_left,
-                "rear_right": self.state.windows.rear_right
-            },
-            "navigation": {
-                "active": self.state.navigation_active,
-                "destination": self.state.destination
-            },
-            "music": {
-                "playing": self.state.music_playing,
-                "track": self.state.current_track,
-                "volume": self.state.volume
-            },
-            "battery": self.state.battery_percentage,
-            "range": self.state.estimated_range
-        }
+        """
+        获取状态摘要
+        
+        返回的字典在每次调用间复用并原地更新，调用方只读、不要修改；
+        需要保留快照时请自行复制或序列化。
+        """
+        state = self.state
+        summary = self._summary
+        
+        ac = summary["ac"]
+        ac["on"] = state.ac.is_on
+        ac["temperature"] = state.ac.temperature
+        ac["fan_speed"] = state.ac.fan_speed
+        
+        windows = summary["windows"]
+        windows["front_left"] = state.windows.front_left
+        windows["front_right"] = state.windows.front_right
+        windows["rear_left"] = state.windows.rear_left
+        windows["rear_right"] = state.windows.rear_right
+        
+        navigation = summary["navigation"]
+        navigation["active"] = state.navigation_active
+        navigation["destination"] = state.destination
+        
+        music = summary["music"]
+        music["playing"] = state.music_playing
+        music["track"] = state.current_track
+        music["volume"] = state.volume
+        
+        summary["battery"] = state.battery_percentage
+        summary["range"] = state.estimated_range
+        return summary
 
 
 # 测试代码
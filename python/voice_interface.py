@@ -5,14 +5,24 @@ Voice Interface - 语音交互接口
 """
 
 import asyncio
+import hashlib
+import os
 import numpy as np
-from typing import AsyncIterator, Optional, Callable, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from queue import SimpleQueue
+from typing import AsyncIterator, Optional, Callable, Any, Tuple, Union
 from dataclasses import dataclass
 import logging
 import io
+import re
+import shutil
 import wave
 import struct
 
+from energy_vad import AMBIGUOUS_RATIO, calibrate_threshold, frame_energies
+
 logger = logging.getLogger(__name__)
 
 # 尝试导入语音相关库
@@ -23,6 +33,20 @@ except ImportError:
     HAS_WHISPER = False
     logger.warning("faster-whisper not installed, ASR will be mocked")
 
+# 长音频批量推理（faster-whisper>=1.1）
+try:
+    from faster_whisper import BatchedInferencePipeline
+    HAS_BATCHED_WHISPER = True
+except ImportError:
+    HAS_BATCHED_WHISPER = False
+
+# C++扩展中的int16->float32转换（AVX2，随推理引擎一同编译）
+try:
+    from cockpit_engine_py import pcm16_to_float32 as _native_pcm16_to_float32
+    HAS_NATIVE_PCM = True
+except ImportError:
+    HAS_NATIVE_PCM = False
+
 try:
     import edge_tts
     HAS_EDGE_TTS = True
@@ -37,6 +61,19 @@ except ImportError:
     HAS_SOUNDDEVICE = False
     logger.warning("sounddevice not installed, audio I/O will be mocked")
 
+# 音频解码：优先miniaudio（进程内解码），否则使用pydub（调用ffmpeg）
+try:
+    import miniaudio
+    HAS_MINIAUDIO = True
+except ImportError:
+    HAS_MINIAUDIO = False
+
+try:
+    from pydub import AudioSegment
+    HAS_PYDUB = True
+except ImportError:
+    HAS_PYDUB = False
+
 try:
     import webrtcvad
     HAS_VAD = True
@@ -44,14 +81,37 @@ except ImportError:
     HAS_VAD = False
     logger.warning("webrtcvad not installed, VAD will be disabled")
 
+# Whisper单次识别的窗口长度，流式识别的缓冲区不超过该长度
+_MAX_BUFFER_SECONDS = 30
+
+# 录音开头用于标定背景噪声能量的时长（秒）
+_VAD_CALIBRATION_SECONDS = 0.3
+
+# 流式解码MP3使用的ffmpeg（pydub同样依赖它）
+_FFMPEG = shutil.which("ffmpeg")
+
+# edge-tts输出24kHz单声道MP3；流式播放每次写入约100ms的PCM
+_TTS_SAMPLE_RATE = 24000
+_PCM_BLOCK_BYTES = _TTS_SAMPLE_RATE // 10 * 2
+
+# TTS文本清理（模块加载时编译）
+_RE_EMOJI = re.compile(r'[✅❌🔧📊🔋🛞🛢️📍🌡️]')
+_RE_WS = re.compile(r'\s+')
+# 含有字母、数字或汉字的片段才值得合成
+_RE_SPEAKABLE = re.compile(r'\w')
+# 句子结束符（不含英文句点，避免切开“26.5度”这类数字）
+_RE_SENTENCE_END = re.compile(r'[。！？!?\n]')
+
 
 @dataclass
 class AudioConfig:
     """音频配置"""
     sample_rate: int = 16000
     channels: int = 1
-    chunk_size: int = 480  # 30ms at 16kHz
+    chunk_size: int = 512  # 32ms at 16kHz，2的幂，能量计算按该块长进行
+    vad_frame_samples: int = 480  # WebRTC VAD帧长（须为10/20/30ms）
     dtype: str = "int16"
+    max_record_seconds: float = 30.0  # VAD模式下单次录音的最大时长
 
 
 @dataclass
@@ -59,9 +119,12 @@ class ASRConfig:
     """ASR配置"""
     model_size: str = "small"  # tiny, base, small, medium, large
     device: str = "cuda"       # cuda, cpu
-    compute_type: str = "float16"  # float16, int8
+    compute_type: str = "auto"  # auto, float16, int8_float16, int8
     language: str = "zh"
     beam_size: int = 5
+    batch_size: int = 0    # 长音频批量推理的批大小，0表示按CPU核数选择
+    cpu_threads: int = 0   # CPU推理线程数，0表示使用一半CPU核数
+    num_workers: int = 2   # 可并行执行转录的工作线程数
 
 
 @dataclass
@@ -71,19 +134,155 @@ class TTSConfig:
     rate: str = "+0%"      # 语速
     volume: str = "+0%"    # 音量
     pitch: str = "+0Hz"    # 音调
+    cache_dir: str = "~/.cache/cockpit_assistant/tts"  # 合成结果的磁盘缓存，为空则只用内存缓存
+    cache_max_entries: int = 512  # 磁盘缓存的条目上限，超出时按最近使用时间淘汰
 
 
 # =============================================================================
 # ASR - 语音识别
 # =============================================================================
 
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+# 无语音判定：短于该时长，或归一化能量总和低于“-30dBFS持续10ms”的音频不送入Whisper
+_MIN_SPEECH_SECONDS = 0.3
+_MIN_SPEECH_ENERGY = 1e-3 * 0.01  # 乘以采样率得到能量总和阈值
+
+# 语种置信度低于该值的识别结果视为噪声
+_MIN_LANGUAGE_PROBABILITY = 0.5
+
+# Whisper在静音/噪声上常见的幻觉输出（去除空白和标点后比较）
+_HALLUCINATIONS = frozenset({
+    "字幕由Amara.org社区提供",
+    "感谢大家",
+    "谢谢大家",
+    "谢谢观看",
+    "请不吝点赞订阅转发打赏支持明镜与点点栏目",
+})
+_RE_HALLUCINATION_STRIP = re.compile(r'[\s。，、！？,!?]+')
+
+
+def _pcm_to_float32(audio_data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    转换为Whisper需要的float32一维音频
+    
+    按dtype决定是否缩放：int16按满幅归一化（一次遍历完成类型转换和缩放），
+    其他浮点输入视为已归一化。给出out时结果直接写入out。
+    """
+    audio_data = audio_data.reshape(-1)
+    if audio_data.dtype == np.int16:
+        if out is None:
+            out = np.empty(audio_data.shape, dtype=np.float32)
+        if HAS_NATIVE_PCM:
+            _native_pcm16_to_float32(audio_data, out)
+        else:
+            np.multiply(audio_data, _INT16_SCALE, out=out)
+        return out
+    if out is not None:
+        out[:] = audio_data
+        return out
+    if audio_data.dtype != np.float32:
+        return np.ascontiguousarray(audio_data, dtype=np.float32)
+    return audio_data
+
+
+def _speech_energy(audio_data: np.ndarray) -> float:
+    """归一化能量总和（int16按满幅缩放），不产生中间数组"""
+    audio_data = audio_data.reshape(-1)
+    if audio_data.dtype == np.int16:
+        return float(np.einsum("i,i->", audio_data, audio_data, dtype=np.int64)) * float(_INT16_SCALE) ** 2
+    return float(np.dot(audio_data, audio_data))
+
+
+def _is_hallucination(text: str, info) -> bool:
+    """识别结果是否为幻觉（已知的静音幻觉文本或语种置信度过低）"""
+    if info.language_probability < _MIN_LANGUAGE_PROBABILITY:
+        return True
+    return _RE_HALLUCINATION_STRIP.sub("", text) in _HALLUCINATIONS
+
+
+def _agreed_prefix(previous: list, current: list) -> int:
+    """LocalAgreement-2：两次识别结果中逐词一致的前缀长度"""
+    n = 0
+    for (_, _, a), (_, _, b) in zip(previous, current):
+        if a.strip() != b.strip():
+            break
+        n += 1
+    return n
+
+
+# 已加载的Whisper模型，按(model_size, device, compute_type)共享，避免重复占用显存
+_WHISPER_MODELS: dict = {}
+
+
+def _get_whisper_model(config: ASRConfig, compute_type: str):
+    """获取共享的Whisper模型，首次加载时预热"""
+    key = (config.model_size, config.device, compute_type)
+    model = _WHISPER_MODELS.get(key)
+    if model is not None:
+        return model
+    
+    logger.info(f"Loading Whisper model: {config.model_size} ({compute_type})")
+    model = WhisperModel(
+        config.model_size,
+        device=config.device,
+        compute_type=compute_type,
+        cpu_threads=config.cpu_threads or max(1, (os.cpu_count() or 2) // 2),
+        num_workers=config.num_workers
+    )
+    # 预热：转录一秒静音，首次真实请求不再承担内核初始化开销
+    segments, _ = model.transcribe(
+        np.zeros(16000, dtype=np.float32),
+        language=config.language,
+        beam_size=1
+    )
+    for _ in segments:
+        pass
+    logger.info("Whisper model loaded")
+    _WHISPER_MODELS[key] = model
+    return model
+
+
 class ASREngine:
     """语音识别引擎"""
     
     def __init__(self, config: ASRConfig = None):
         self.config = config or ASRConfig()
         self._model = None
+        self._batched = None
         self._initialized = False
+        # 识别专用的单线程池，不与其他阻塞调用争用默认线程池，排队的识别可随任务取消
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _resolve_compute_type(self) -> str:
+        """
+        选择量化类型
+        
+        auto时CPU使用int8；GPU支持int8_float16（Ampere及以上）时使用int8_float16，
+        否则使用float16。
+        """
+        compute_type = self.config.compute_type
+        if compute_type != "auto":
+            return compute_type
+        if self.config.device == "cpu":
+            return "int8"
+        
+        import ctranslate2  # faster-whisper的依赖
+        if "int8_float16" in ctranslate2.get_supported_compute_types(self.config.device):
+            return "int8_float16"
+        return "float16"
+    
+    def _run(self, func: Callable, *args) -> asyncio.Future:
+        """在识别线程中执行阻塞调用"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def close(self):
+        """关闭识别线程，取消排队中的识别"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
     
     def initialize(self):
         """初始化ASR模型"""
@@ -91,13 +290,7 @@ class ASREngine:
             return
         
         if HAS_WHISPER:
-            logger.info(f"Loading Whisper model: {self.config.model_size}")
-            self._model = WhisperModel(
-                self.config.model_size,
-                device=self.config.device,
-                compute_type=self.config.compute_type
-            )
-            logger.info("Whisper model loaded")
+            self._model = _get_whisper_model(self.config, self._resolve_compute_type())
         else:
             logger.warning("Using mock ASR")
         
@@ -125,33 +318,180 @@ class ASREngine:
             # 模拟ASR
             return "模拟语音识别结果"
         
-        # 在线程池中运行转录
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            self._transcribe_sync,
-            audio_data,
-            sample_rate
-        )
-        return result
+        # 过短或几乎无能量的音频不可能包含语音，跳过识别
+        if (len(audio_data) < _MIN_SPEECH_SECONDS * sample_rate
+                or _speech_energy(audio_data) < _MIN_SPEECH_ENERGY * sample_rate):
+            return ""
+        
+        # 在识别线程中运行转录
+        return await self._run(self._transcribe_sync, audio_data, sample_rate)
     
-    def _transcribe_sync(self, audio_data: np.ndarray, sample_rate: int) -> str:
-        """同步转录"""
-        # 确保音频格式正确
-        if audio_data.dtype != np.float32:
-            audio_data = audio_data.astype(np.float32)
-            if audio_data.max() > 1.0:
-                audio_data = audio_data / 32768.0
+    async def transcribe_stream(
+        self,
+        chunks: AsyncIterator[np.ndarray],
+        sample_rate: int = 16000,
+        min_chunk_seconds: float = 1.0
+    ) -> AsyncIterator[str]:
+        """
+        流式转录（边录音边识别）
+        
+        滚动缓冲区每新增min_chunk_seconds秒音频识别一次，按LocalAgreement-2
+        确认与上一次识别结果一致的前缀，并在最后确认词的结束处裁剪缓冲区。
+        录音结束时只需识别尚未确认的尾部音频。
+        
+        Args:
+            chunks: 音频块异步迭代器
+            sample_rate: 采样率
+            min_chunk_seconds: 两次识别之间最少新增的音频时长（秒）
+            
+        Yields:
+            新确认的文本片段
+        """
+        if not self._initialized:
+            self.initialize()
         
+        if self._model is None:
+            # 模拟ASR
+            has_audio = False
+            async for chunk in chunks:
+                has_audio = has_audio or len(chunk) > 0
+            if has_audio:
+                yield "模拟语音识别结果"
+            return
+        
+        min_samples = int(min_chunk_seconds * sample_rate)
+        max_samples = _MAX_BUFFER_SECONDS * sample_rate
+        # 累计时长和能量达到语音下限之前不启动识别
+        min_speech_samples = _MIN_SPEECH_SECONDS * sample_rate
+        min_speech_energy = _MIN_SPEECH_ENERGY * sample_rate
+        total = 0
+        energy = 0.0
+        voiced = False
+        # 预分配的float32缓冲区，音频块转换后直接写入尾部，size为有效长度
+        buffer = np.empty(max_samples + min_samples, dtype=np.float32)
+        size = 0
+        pending = 0
+        previous = []  # 上一次识别中未确认的词 [(start, end, word)]
+        inflight = None
+        
+        def keep_tail(start: int):
+            """丢弃缓冲区start之前的音频（仅在没有进行中的识别时调用）"""
+            nonlocal size
+            size -= start
+            buffer[:size] = buffer[start:start + size]
+        
+        def settle(words: list) -> str:
+            """对一次识别结果做一致性确认，裁剪缓冲区，返回新确认的文本"""
+            nonlocal previous
+            text = ""
+            agreed = _agreed_prefix(previous, words)
+            if agreed:
+                text = "".join(w for _, _, w in words[:agreed])
+                cut = words[agreed - 1][1]
+                keep_tail(min(int(cut * sample_rate), size))
+                words = [(start - cut, end - cut, w) for start, end, w in words[agreed:]]
+            elif size > max_samples:
+                # 超出识别窗口仍未达成一致，直接确认当前结果
+                text = "".join(w for _, _, w in words)
+                keep_tail(size - min_samples)
+                words = []
+            previous = words
+            return text
+        
+        # 识别在线程池中进行，期间继续接收音频块，录音和端点检测不被识别阻塞。
+        # 识别的是提交时缓冲区前size个采样的视图，之后的音频只写入其后的位置。
+        try:
+            async for chunk in chunks:
+                chunk = chunk.reshape(-1)
+                n = len(chunk)
+                if size + n > len(buffer):
+                    # 识别耗时过长时缓冲区可能写满，换用更大的缓冲区（进行中的识别仍引用旧缓冲区）
+                    grown = np.empty(2 * (size + n), dtype=np.float32)
+                    grown[:size] = buffer[:size]
+                    buffer = grown
+                _pcm_to_float32(chunk, out=buffer[size:size + n])
+                if not voiced:
+                    total += n
+                    energy += _speech_energy(buffer[size:size + n])
+                    voiced = total >= min_speech_samples and energy >= min_speech_energy
+                size += n
+                pending += n
+                
+                if inflight is not None and inflight.done():
+                    text = settle(inflight.result())
+                    inflight = None
+                    if text:
+                        yield text
+                
+                if voiced and inflight is None and pending >= min_samples:
+                    pending = 0
+                    inflight = self._run(self._transcribe_words_sync, buffer[:size])
+            
+            if inflight is not None:
+                text = settle(await inflight)
+                inflight = None
+                if text:
+                    yield text
+        finally:
+            # 提前退出（取消或异常）时撤销尚未开始的识别
+            if inflight is not None:
+                inflight.cancel()
+        
+        if voiced and size > 0:
+            words = await self._run(self._transcribe_words_sync, buffer[:size])
+            if words:
+                yield "".join(w for _, _, w in words)
+    
+    def _transcribe_words_sync(self, audio_data: np.ndarray) -> list:
+        """同步转录，返回带时间戳的词 [(start, end, word)]"""
         segments, info = self._model.transcribe(
             audio_data,
             language=self.config.language,
             beam_size=self.config.beam_size,
+            word_timestamps=True,
             vad_filter=True
         )
+        words = [(w.start, w.end, w.word) for segment in segments for w in segment.words]
+        if words and _is_hallucination("".join(w for _, _, w in words), info):
+            return []
+        return words
+    
+    def _batched_transcribe(self, audio):
+        """
+        批量推理：按VAD切分语音段，合并为不超过30秒的块后成批解码
         
-        text = "".join(segment.text for segment in segments)
-        return text.strip()
+        静音被跳过，编码器每个块只运行一次。
+        """
+        if self._batched is None:
+            self._batched = BatchedInferencePipeline(model=self._model)
+        batch_size = self.config.batch_size or max(1, (os.cpu_count() or 1) * 3 // 2)
+        return self._batched.transcribe(
+            audio,
+            language=self.config.language,
+            beam_size=self.config.beam_size,
+            batch_size=batch_size
+        )
+    
+    def _transcribe_sync(self, audio_data: np.ndarray, sample_rate: int) -> str:
+        """同步转录"""
+        # 确保音频格式正确
+        audio_data = _pcm_to_float32(audio_data)
+        
+        if HAS_BATCHED_WHISPER and len(audio_data) > _MAX_BUFFER_SECONDS * sample_rate:
+            # 超过一个识别窗口的长音频走批量推理
+            segments, info = self._batched_transcribe(audio_data)
+        else:
+            segments, info = self._model.transcribe(
+                audio_data,
+                language=self.config.language,
+                beam_size=self.config.beam_size,
+                vad_filter=True
+            )
+        
+        text = "".join(segment.text for segment in segments).strip()
+        if text and _is_hallucination(text, info):
+            return ""
+        return text
     
     def transcribe_file(self, file_path: str) -> str:
         """转录音频文件"""
@@ -161,11 +501,14 @@ class ASREngine:
         if self._model is None:
             return "模拟语音识别结果"
         
-        segments, info = self._model.transcribe(
-            file_path,
-            language=self.config.language,
-            beam_size=self.config.beam_size
-        )
+        if HAS_BATCHED_WHISPER:
+            segments, info = self._batched_transcribe(file_path)
+        else:
+            segments, info = self._model.transcribe(
+                file_path,
+                language=self.config.language,
+                beam_size=self.config.beam_size
+            )
         
         return "".join(segment.text for segment in segments).strip()
 
@@ -174,6 +517,56 @@ class ASREngine:
 # TTS - 语音合成
 # =============================================================================
 
+def _strip_json(text: str) -> Tuple[str, str]:
+    """
+    移除文本中完整的JSON对象（按括号配对，支持嵌套和字符串中的括号）
+    
+    Returns:
+        (移除后的文本, 从未闭合的"{"开始的原文；没有则为空串)
+    """
+    if "{" not in text:
+        return text, ""
+    
+    out = []
+    depth = 0
+    start = 0  # 当前JSON之外片段的起点
+    opened = 0  # 当前最外层JSON的起点
+    in_str = escape = False
+    for i, ch in enumerate(text):
+        if depth == 0:
+            if ch == "{":
+                out.append(text[start:i])
+                opened = i
+                depth = 1
+        elif in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                start = i + 1
+    
+    if depth:
+        return "".join(out), text[opened:]
+    out.append(text[start:])
+    return "".join(out), ""
+
+
+def clean_for_tts(text: str) -> str:
+    """清理文本用于TTS：移除JSON和特殊符号、合并空白，没有可读字符时返回空串"""
+    text, _ = _strip_json(text)
+    text = _RE_WS.sub(' ', _RE_EMOJI.sub('', text)).strip()
+    return text if _RE_SPEAKABLE.search(text) else ""
+
+
 class TTSEngine:
     """语音合成引擎"""
     
@@ -187,8 +580,78 @@ class TTSEngine:
         "yunyang": "zh-CN-YunyangNeural",        # 男声，新闻播报
     }
     
+    # 内存缓存的条目数（常用的短句确认语）
+    MEMORY_CACHE_SIZE = 64
+    
     def __init__(self, config: TTSConfig = None):
         self.config = config or TTSConfig()
+        self._memory_cache: "OrderedDict[str, bytes]" = OrderedDict()
+    
+    def _cache_key(self, text: str) -> str:
+        """缓存键：语音参数与文本共同决定合成结果"""
+        c = self.config
+        return hashlib.sha1(f"{c.voice}|{c.rate}|{c.volume}|{c.pitch}|{text}".encode("utf-8")).hexdigest()
+    
+    def _cache_path(self, key: str) -> Optional[str]:
+        if not self.config.cache_dir:
+            return None
+        return os.path.join(os.path.expanduser(self.config.cache_dir), key + ".mp3")
+    
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        """依次查找内存缓存和磁盘缓存"""
+        data = self._memory_cache.get(key)
+        if data is not None:
+            self._memory_cache.move_to_end(key)
+            return data
+        
+        path = self._cache_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 命中时更新修改时间，淘汰按mtime进行即为LRU
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+    
+    def _cache_put(self, key: str, data: bytes):
+        """写入内存缓存和磁盘缓存（先写临时文件再替换，避免读到半个文件）"""
+        self._remember(key, data)
+        path = self._cache_path(key)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict_disk(os.path.dirname(path))
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+    
+    def _evict_disk(self, cache_dir: str):
+        """磁盘缓存超出条目上限时删除最久未使用的文件"""
+        with os.scandir(cache_dir) as it:
+            entries = [e for e in it if e.name.endswith(".mp3") and e.is_file()]
+        excess = len(entries) - self.config.cache_max_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # 其他进程已删除
+    
+    def _remember(self, key: str, data: bytes):
+        self._memory_cache[key] = data
+        self._memory_cache.move_to_end(key)
+        if len(self._memory_cache) > self.MEMORY_CACHE_SIZE:
+            self._memory_cache.popitem(last=False)
     
     async def synthesize(self, text: str) -> bytes:
         """
@@ -204,20 +667,19 @@ class TTSEngine:
             # 返回空的音频数据
             return b""
         
-        communicate = edge_tts.Communicate(
-            text,
-            self.config.voice,
-            rate=self.config.rate,
-            volume=self.config.volume,
-            pitch=self.config.pitch
-        )
-        
-        audio_data = b""
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_data += chunk["data"]
-        
-        return audio_data
+        return b"".join([chunk async for chunk in self.synthesize_stream(text)])
+    
+    async def prewarm(self, texts):
+        """预先合成常用短句并写入缓存"""
+        if not HAS_EDGE_TTS:
+            return
+        for text in texts:
+            if self._cache_get(self._cache_key(text)) is None:
+                try:
+                    await self.synthesize(text)
+                except Exception as e:
+                    logger.warning(f"TTS prewarm failed: {e}")
+                    return
     
     async def synthesize_stream(self, text: str) -> AsyncIterator[bytes]:
         """
@@ -233,6 +695,12 @@ class TTSEngine:
             yield b""
             return
         
+        key = self._cache_key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+        
         communicate = edge_tts.Communicate(
             text,
             self.config.voice,
@@ -241,9 +709,15 @@ class TTSEngine:
             pitch=self.config.pitch
         )
         
+        # 边产出边收集，完整合成后写入缓存
+        parts = []
         async for chunk in communicate.stream():
             if chunk["type"] == "audio":
+                parts.append(chunk["data"])
                 yield chunk["data"]
+        
+        if parts:
+            self._cache_put(key, b"".join(parts))
     
     def set_voice(self, voice_name: str):
         """设置语音"""
@@ -281,12 +755,12 @@ class VADEngine:
         if HAS_VAD:
             self._vad = webrtcvad.Vad(aggressiveness)
     
-    def is_speech(self, audio_chunk: bytes) -> bool:
+    def is_speech(self, audio_chunk: Union[bytes, memoryview]) -> bool:
         """
         检测音频块是否包含语音
         
         Args:
-            audio_chunk: 音频数据 (10, 20, 或 30ms的PCM数据)
+            audio_chunk: 音频数据 (10, 20, 或 30ms的PCM数据)，支持缓冲区协议的对象均可
             
         Returns:
             是否包含语音
@@ -298,6 +772,64 @@ class VADEngine:
             return self._vad.is_speech(audio_chunk, self.sample_rate)
         except:
             return True
+    
+    def update_silence(
+        self,
+        pcm: np.ndarray,
+        frame_len: int,
+        threshold: float,
+        silence: int,
+        vad_frame_len: int = None
+    ) -> int:
+        """
+        按帧能量更新连续静音帧数（遇到语音帧清零）
+        
+        能量低于阈值判为静音，高于AMBIGUOUS_RATIO倍阈值判为语音，
+        只有介于两者之间的帧才调用WebRTC VAD：把该帧重新切成vad_frame_len
+        长的子帧，任一子帧为语音即判为语音。
+        
+        Args:
+            pcm: int16音频
+            frame_len: 能量计算的帧长
+            threshold: 帧平均能量阈值
+            silence: 当前连续静音帧数
+            vad_frame_len: WebRTC VAD子帧长（须为10/20/30ms），默认等于frame_len
+            
+        Returns:
+            新的连续静音帧数
+        """
+        vad_frame_len = min(vad_frame_len or frame_len, frame_len)
+        high = threshold * AMBIGUOUS_RATIO
+        # webrtcvad按缓冲区协议读取数据，直接传入字节视图，不复制成bytes
+        buf = memoryview(np.ascontiguousarray(pcm)).cast("B")
+        frame_bytes = frame_len * 2
+        vad_bytes = vad_frame_len * 2
+        for i, energy in enumerate(frame_energies(pcm, frame_len)):
+            start = i * frame_bytes
+            if energy > high or (
+                energy > threshold
+                and any(
+                    self.is_speech(buf[j:j + vad_bytes])
+                    for j in range(start, start + frame_bytes - vad_bytes + 1, vad_bytes)
+                )
+            ):
+                silence = 0
+            else:
+                silence += 1
+        return silence
+
+
+# 按(sample_rate, aggressiveness)缓存的VAD实例
+_VAD_CACHE: dict = {}
+
+
+def get_vad(sample_rate: int, aggressiveness: int = 2) -> VADEngine:
+    """获取共享的VAD实例，避免每次录音都创建webrtcvad对象"""
+    key = (sample_rate, aggressiveness)
+    vad = _VAD_CACHE.get(key)
+    if vad is None:
+        vad = _VAD_CACHE[key] = VADEngine(aggressiveness, sample_rate)
+    return vad
 
 
 # =============================================================================
@@ -311,79 +843,189 @@ class AudioRecorder:
         self.config = config or AudioConfig()
         self._stream = None
         self._recording = False
-        self._audio_buffer = []
+        self._stop_stream: Optional[Callable[[], None]] = None
+        # 当前录制的音频接收函数，为None时输入流的数据被丢弃
+        self._sink: Optional[Callable[[np.ndarray], None]] = None
+        # 预分配的环形缓冲区（整数个音频块），回调直接把音频写入其中，不再逐块分配
+        frame = self.config.chunk_size * self.config.channels
+        capacity = int(self.config.max_record_seconds * self.config.sample_rate) * self.config.channels
+        self._ring = np.empty(max(frame, capacity // frame * frame), dtype=self.config.dtype)
+        self._ring_pos = 0
     
-    async def record(
-        self, 
+    def _callback(self, indata, frames, time, status):
+        """输入流回调（PortAudio线程）"""
+        sink = self._sink
+        if sink is not None and self._recording:
+            sink(indata)
+    
+    def _ensure_stream(self):
+        """首次录制时打开输入流并保持运行，后续录制不再重复打开设备"""
+        if self._stream is None:
+            self._stream = sd.InputStream(
+                samplerate=self.config.sample_rate,
+                channels=self.config.channels,
+                dtype=self.config.dtype,
+                blocksize=self.config.chunk_size,
+                callback=self._callback
+            )
+            self._stream.start()
+    
+    async def stream(
+        self,
         duration: float = None,
         vad_timeout: float = 2.0,
         on_audio: Callable[[np.ndarray], None] = None
-    ) -> np.ndarray:
+    ) -> AsyncIterator[np.ndarray]:
         """
-        录制音频
+        流式录制音频，音频块到达即产出
         
         Args:
             duration: 录制时长（秒），None表示使用VAD自动检测
             vad_timeout: VAD超时时间（连续无语音多久后停止）
             on_audio: 实时音频回调
             
-        Returns:
-            录制的音频数据
+        Yields:
+            一维音频块（环形缓冲区的视图，约max_record_seconds秒后被覆盖，需及时使用或复制）
         """
         if not HAS_SOUNDDEVICE:
             logger.warning("sounddevice not available, returning mock audio")
-            return np.zeros(int(self.config.sample_rate * 3), dtype=np.int16)
+            yield np.zeros(int(self.config.sample_rate * 3), dtype=np.int16)
+            return
         
-        self._audio_buffer = []
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
         self._recording = True
+        # stop()可能在其他线程调用，通过事件循环投递结束标记
+        self._stop_stream = lambda: loop.call_soon_threadsafe(queue.put_nowait, None)
         
-        vad = VADEngine(sample_rate=self.config.sample_rate)
+        # 端点检测：能量VAD按帧统计连续静音，阈值由开头一段背景噪声标定
+        vad = get_vad(self.config.sample_rate)
+        frame_len = self.config.chunk_size * self.config.channels
+        calibration_len = int(_VAD_CALIBRATION_SECONDS * self.config.sample_rate) * self.config.channels
+        noise = []
+        noise_len = 0
+        threshold = None
         silence_frames = 0
         max_silence_frames = int(vad_timeout * self.config.sample_rate / self.config.chunk_size)
+        remaining = int(duration * self.config.sample_rate) if duration else None
         
-        def callback(indata, frames, time, status):
-            if not self._recording:
-                return
-            
-            self._audio_buffer.append(indata.copy())
+        ring = self._ring
+        self._ring_pos = 0
+        
+        def sink(indata):
+            # 回调运行在PortAudio线程：写入环形缓冲区，把该段的视图交给事件循环
+            n = indata.size
+            start = self._ring_pos
+            if start + n > len(ring):
+                start = 0
+            chunk = ring[start:start + n]
+            chunk[:] = indata.reshape(-1)
+            self._ring_pos = start + n
+            loop.call_soon_threadsafe(queue.put_nowait, chunk)
             
             if on_audio:
                 on_audio(indata)
         
-        with sd.InputStream(
-            samplerate=self.config.sample_rate,
-            channels=self.config.channels,
-            dtype=self.config.dtype,
-            blocksize=self.config.chunk_size,
-            callback=callback
-        ):
-            if duration:
-                await asyncio.sleep(duration)
-            else:
-                # VAD模式
-                while self._recording:
-                    await asyncio.sleep(0.03)
-                    
-                    if len(self._audio_buffer) > 0:
-                        last_chunk = self._audio_buffer[-1]
-                        is_speech = vad.is_speech(last_chunk.tobytes())
-                        
-                        if is_speech:
-                            silence_frames = 0
-                        else:
-                            silence_frames += 1
-                            if silence_frames > max_silence_frames:
-                                break
+        self._ensure_stream()
+        self._sink = sink
+        try:
+            while self._recording:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+                
+                if remaining is not None:
+                    remaining -= len(chunk)
+                    if remaining <= 0:
+                        break
+                elif threshold is None:
+                    noise.append(chunk)
+                    noise_len += len(chunk)
+                    silence_frames += len(chunk) // frame_len
+                    if noise_len >= calibration_len:
+                        threshold = calibrate_threshold(np.concatenate(noise), frame_len)
+                else:
+                    silence_frames = vad.update_silence(
+                        chunk, frame_len, threshold, silence_frames, self.config.vad_frame_samples
+                    )
+                    if silence_frames > max_silence_frames:
+                        break
+        finally:
+            self._sink = None
+            self._recording = False
+            self._stop_stream = None
+    
+    async def record(
+        self, 
+        duration: float = None,
+        vad_timeout: float = 2.0,
+        on_audio: Callable[[np.ndarray], None] = None
+    ) -> np.ndarray:
+        """
+        录制音频
         
-        self._recording = False
+        Args:
+            duration: 录制时长（秒），None表示使用VAD自动检测
+            vad_timeout: VAD超时时间（连续无语音多久后停止）
+            on_audio: 实时音频回调
+            
+        Returns:
+            录制的音频数据
+        """
+        # 按最大时长一次分配，音频块直接写入，省去逐块保存和最后的拼接
+        seconds = duration or self.config.max_record_seconds
+        capacity = int(seconds * self.config.sample_rate * self.config.channels)
+        audio = np.empty(capacity, dtype=self.config.dtype)
+        size = 0
         
-        if self._audio_buffer:
-            return np.concatenate(self._audio_buffer, axis=0).flatten()
-        return np.array([], dtype=np.int16)
+        async with aclosing(self.stream(duration, vad_timeout, on_audio)) as chunks:
+            async for chunk in chunks:
+                end = min(size + len(chunk), capacity)
+                audio[size:end] = chunk[:end - size]
+                size = end
+                if size == capacity:
+                    break
+        
+        return audio[:size]
     
     def stop(self):
         """停止录制"""
         self._recording = False
+        if self._stop_stream is not None:
+            self._stop_stream()
+    
+    def close(self):
+        """停止录制并关闭输入流"""
+        self.stop()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+if HAS_MINIAUDIO:
+    class _ChunkSource(miniaudio.StreamableSource):
+        """把陆续到达的MP3数据块提供给miniaudio流式解码（在解码线程中阻塞读取）"""
+        
+        def __init__(self):
+            self._chunks: SimpleQueue = SimpleQueue()
+            self._pending = b""
+            self._eof = False
+        
+        def feed(self, data: Optional[bytes]):
+            """追加数据块，None表示数据结束"""
+            self._chunks.put(data)
+        
+        def read(self, num_bytes: int) -> bytes:
+            # edge-tts的数据块与MP3帧边界不对齐，不足部分留到下次读取
+            while len(self._pending) < num_bytes and not self._eof:
+                data = self._chunks.get()
+                if data is None:
+                    self._eof = True
+                else:
+                    self._pending += data
+            data, self._pending = self._pending[:num_bytes], self._pending[num_bytes:]
+            return data
 
 
 class AudioPlayer:
@@ -392,6 +1034,28 @@ class AudioPlayer:
     def __init__(self, config: AudioConfig = None):
         self.config = config or AudioConfig()
         self._playing = False
+        self._out = None
+        self._out_format = None
+    
+    def _output_stream(self, sample_rate: int, channels: int, dtype: str):
+        """
+        获取持久输出流
+        
+        格式不变时复用已打开的流，避免每次播放都重新打开设备；
+        格式变化时关闭旧流再打开新流。
+        """
+        fmt = (sample_rate, channels, dtype)
+        if self._out is None or self._out_format != fmt:
+            self.close()
+            self._out = sd.OutputStream(
+                samplerate=sample_rate,
+                channels=channels,
+                dtype=dtype,
+                latency="low"
+            )
+            self._out.start()
+            self._out_format = fmt
+        return self._out
     
     async def play(self, audio_data: np.ndarray, sample_rate: int = None):
         """
@@ -406,18 +1070,23 @@ class AudioPlayer:
             return
         
         sample_rate = sample_rate or self.config.sample_rate
-        self._playing = True
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
-            sd.play,
-            audio_data,
-            sample_rate
-        )
-        await loop.run_in_executor(None, sd.wait)
+        if audio_data.dtype == np.float64:
+            audio_data = audio_data.astype(np.float32)
+        audio_data = np.ascontiguousarray(audio_data)
+        channels = audio_data.shape[1] if audio_data.ndim == 2 else 1
+        out = self._output_stream(sample_rate, channels, audio_data.dtype.name)
         
-        self._playing = False
+        # 分块写入（约100ms一块），stop()后在下一块前停止
+        block = sample_rate // 10
+        loop = asyncio.get_running_loop()
+        self._playing = True
+        try:
+            for start in range(0, len(audio_data), block):
+                if not self._playing:
+                    break
+                await loop.run_in_executor(None, out.write, audio_data[start:start + block])
+        finally:
+            self._playing = False
     
     async def play_bytes(self, audio_bytes: bytes, format: str = "mp3"):
         """
@@ -430,26 +1099,135 @@ class AudioPlayer:
         if not audio_bytes:
             return
         
-        # 需要安装pydub来解码mp3
-        try:
-            from pydub import AudioSegment
-            
+        if HAS_MINIAUDIO and format in ("mp3", "wav", "flac"):
+            # 进程内按原始采样率和声道解码，不必为每段音频启动ffmpeg
+            reader = getattr(miniaudio, f"{format}_read_s16")
+            decoded = reader(audio_bytes)
+            samples = np.frombuffer(decoded.samples, dtype=np.int16)
+            channels, frame_rate = decoded.nchannels, decoded.sample_rate
+        elif HAS_PYDUB:
             audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=format)
             samples = np.array(audio.get_array_of_samples())
-            
-            if audio.channels == 2:
-                samples = samples.reshape((-1, 2))
-            
-            await self.play(samples, audio.frame_rate)
-            
-        except ImportError:
-            logger.warning("pydub not installed, cannot play audio")
+            channels, frame_rate = audio.channels, audio.frame_rate
+        else:
+            logger.warning("miniaudio/pydub not installed, cannot play audio")
+            return
+        
+        if channels == 2:
+            samples = samples.reshape((-1, 2))
+        
+        await self.play(samples, frame_rate)
+    
+    async def play_stream(self, chunks: AsyncIterator[bytes], sample_rate: int = _TTS_SAMPLE_RATE):
+        """
+        流式播放MP3数据
+        
+        所有数据块送入同一个解码会话（miniaudio或ffmpeg管道），解码出的PCM
+        随即写入输出流。收到第一个数据块后即开始播放，不必等待完整音频。
+        
+        Args:
+            chunks: MP3数据块异步迭代器
+            sample_rate: 输出采样率
+        """
+        if HAS_SOUNDDEVICE and HAS_MINIAUDIO:
+            await self._play_stream_miniaudio(chunks, sample_rate)
+        elif HAS_SOUNDDEVICE and _FFMPEG is not None:
+            await self._play_stream_ffmpeg(chunks, sample_rate)
+        else:
+            # 无法流式解码时收齐后整体播放
+            await self.play_bytes(b"".join([chunk async for chunk in chunks]), format="mp3")
+    
+    async def _play_stream_miniaudio(self, chunks: AsyncIterator[bytes], sample_rate: int):
+        """miniaudio进程内流式解码"""
+        source = _ChunkSource()
+        out = self._output_stream(sample_rate, 1, "int16")
+        
+        def decode_and_play():
+            # 解码线程：按需从source读取MP3数据，每解码约100ms即写入输出流
+            blocks = miniaudio.stream_any(
+                source,
+                source_format=miniaudio.FileFormat.MP3,
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=1,
+                sample_rate=sample_rate,
+                frames_to_read=sample_rate // 10
+            )
+            for block in blocks:
+                if not self._playing:
+                    break
+                out.write(np.frombuffer(block, dtype=np.int16))
+        
+        loop = asyncio.get_running_loop()
+        self._playing = True
+        player = loop.run_in_executor(None, decode_and_play)
+        try:
+            try:
+                async for chunk in chunks:
+                    if player.done():
+                        break
+                    source.feed(chunk)
+            finally:
+                source.feed(None)
+            await player
+        finally:
+            self._playing = False
+    
+    async def _play_stream_ffmpeg(self, chunks: AsyncIterator[bytes], sample_rate: int):
+        """ffmpeg管道流式解码"""
+        proc = await asyncio.create_subprocess_exec(
+            _FFMPEG, "-loglevel", "quiet",
+            "-f", "mp3", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+        
+        async def feed():
+            # 管道写满时drain等待解码，合成与解码之间自然限流
+            try:
+                async for chunk in chunks:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+            finally:
+                proc.stdin.close()
+        
+        feeder = asyncio.create_task(feed())
+        loop = asyncio.get_running_loop()
+        out = self._output_stream(sample_rate, 1, "int16")
+        self._playing = True
+        try:
+            rest = b""
+            while self._playing:
+                data = await proc.stdout.read(_PCM_BLOCK_BYTES)
+                if not data:
+                    break
+                # 读取长度可能不是整数个采样，余下的字节并入下一块
+                data = rest + data
+                size = len(data) & ~1
+                rest = data[size:]
+                if size:
+                    # 设备缓冲区满时write会阻塞，放到线程中执行
+                    pcm = np.frombuffer(data, dtype=np.int16, count=size // 2)
+                    await loop.run_in_executor(None, out.write, pcm)
+        finally:
+            self._playing = False
+            feeder.cancel()
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
     
     def stop(self):
         """停止播放"""
-        if HAS_SOUNDDEVICE:
-            sd.stop()
         self._playing = False
+    
+    def close(self):
+        """停止播放并关闭输出流"""
+        self._playing = False
+        if self._out is not None:
+            self._out.abort()
+            self._out.close()
+            self._out = None
+            self._out_format = None
 
 
 # =============================================================================
@@ -489,17 +1267,18 @@ class VoiceInterface:
         """
         self._is_listening = True
         
-        # 录制音频
-        audio_data = await self.recorder.record(duration=duration)
-        
-        self._is_listening = False
-        
-        # 识别
-        if len(audio_data) > 0:
-            text = await self.asr.transcribe(audio_data)
-            return text
+        # 边录制边识别，录音结束时只剩尾部音频待识别
+        try:
+            parts = [
+                text async for text in self.asr.transcribe_stream(
+                    self.recorder.stream(duration=duration),
+                    self.recorder.config.sample_rate
+                )
+            ]
+        finally:
+            self._is_listening = False
         
-        return ""
+        return "".join(parts).strip()
     
     async def speak(self, text: str):
         """
@@ -508,14 +1287,71 @@ class VoiceInterface:
         Args:
             text: 要播报的文本
         """
-        audio_bytes = await self.tts.synthesize(text)
-        if audio_bytes:
-            await self.player.play_bytes(audio_bytes, format="mp3")
+        if not HAS_EDGE_TTS:
+            return
+        # 合成与播放流水线进行，首个音频块到达即开始播放
+        await self.player.play_stream(self.tts.synthesize_stream(text))
     
     async def speak_stream(self, text: str):
-        """流式语音播报"""
-        async for audio_chunk in self.tts.synthesize_stream(text):
-            await self.player.play_bytes(audio_chunk, format="mp3")
+        """流式语音播报（所有数据块共用一个解码会话）"""
+        await self.player.play_stream(self.tts.synthesize_stream(text))
+    
+    async def speak_tokens(self, tokens: AsyncIterator[str]) -> str:
+        """
+        边生成边播报：每凑满一句立即提交TTS合成，与后续生成重叠，按句子顺序播放
+        
+        函数调用JSON在切分前整体移除，单句合成或播放失败只跳过该句。
+        
+        Args:
+            tokens: LLM输出的文本片段
+            
+        Returns:
+            完整的响应文本
+        """
+        synth_queue: asyncio.Queue = asyncio.Queue()
+        
+        async def play_in_order():
+            while (task := await synth_queue.get()) is not None:
+                try:
+                    audio_bytes = await task
+                    if audio_bytes:
+                        await self.player.play_bytes(audio_bytes, format="mp3")
+                except Exception as e:
+                    logger.warning(f"TTS播报失败: {e}")
+        
+        def dispatch(sentence: str):
+            clean = clean_for_tts(sentence)
+            if clean:
+                synth_queue.put_nowait(asyncio.create_task(self.tts.synthesize(clean)))
+        
+        player = asyncio.create_task(play_in_order())
+        parts = []
+        pending = ""
+        try:
+            async for token in tokens:
+                parts.append(token)
+                # 完整的JSON先移除，未闭合的部分留待后续片段，只在其之前的文本中切分
+                pending, tail = _strip_json(pending + token)
+                last = None
+                for last in _RE_SENTENCE_END.finditer(pending):
+                    pass
+                if last is not None:
+                    dispatch(pending[:last.end()])
+                    pending = pending[last.end():]
+                pending += tail
+            
+            dispatch(pending)
+            synth_queue.put_nowait(None)
+            await player
+        finally:
+            if not player.done():
+                player.cancel()
+                while not synth_queue.empty():
+                    task = synth_queue.get_nowait()
+                    if task is not None:
+                        task.cancel()
+        
+        return "".join(parts)
     
     def stop(self):
         """停止当前操作"""
@@ -523,6 +1359,13 @@ class VoiceInterface:
         self.player.stop()
         self._is_listening = False
     
+    def close(self):
+        """停止并关闭音频设备和识别线程"""
+        self.recorder.close()
+        self.player.close()
+        self.asr.close()
+        self._is_listening = False
+    
     @property
     def is_listening(self) -> bool:
         return self._is_listening
@@ -535,6 +1378,18 @@ class VoiceInterface:
 class CockpitVoiceAssistant:
     """带语音交互的座舱助手"""
     
+    # 启动时预先合成的常用确认语（每项一句：speak_tokens按句合成，缓存键是单句文本）
+    COMMON_PHRASES = (
+        "好的，已关闭空调。",
+        "好的，正在操作车窗。",
+        "好的，正在为您规划路线。",
+        "好的，正在播放音乐。",
+        "好的，我来查询车辆状态。",
+        "好的，我来查询天气。",
+        "好的，我明白了。",
+        "还有什么需要帮助的吗？",
+    )
+    
     def __init__(
         self,
         model_path: str,
@@ -564,34 +1419,18 @@ class CockpitVoiceAssistant:
         
         logger.info(f"User: {user_text}")
         
-        # 2. 获取LLM响应
-        response_text = ""
-        async for token in self.assistant.chat(user_text):
-            response_text += token
-        
+        # 2. 流式获取LLM响应并按句子边生成边播报
+        response_text = await self.voice.speak_tokens(self.assistant.chat(user_text))
         logger.info(f"Assistant: {response_text}")
         
-        # 3. 语音播报
-        # 清理响应文本（移除JSON部分）
-        clean_response = self._clean_response_for_tts(response_text)
-        if clean_response:
-            await self.voice.speak(clean_response)
-        
         return response_text
     
-    def _clean_response_for_tts(self, response: str) -> str:
-        """清理响应文本用于TTS"""
-        import re
-        # 移除JSON
-        cleaned = re.sub(r'\{[^}]+\}', '', response)
-        # 移除多余空白
-        cleaned = ' '.join(cleaned.split())
-        return cleaned.strip()
-    
     async def run_loop(self):
         """运行交互循环"""
         self._running = True
         logger.info("Voice assistant started. Say wake word to begin.")
+        # 后台预热常用短句的TTS缓存
+        prewarm = asyncio.create_task(self.voice.tts.prewarm(self.COMMON_PHRASES))
         
         while self._running:
             try:
@@ -602,12 +1441,13 @@ class CockpitVoiceAssistant:
                 logger.error(f"Error: {e}")
                 await asyncio.sleep(1)
         
+        prewarm.cancel()
         logger.info("Voice assistant stopped.")
     
     def stop(self):
         """停止"""
         self._running = False
-        self.voice.stop()
+        self.voice.close()
 
 
 # =============================================================================
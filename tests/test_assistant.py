@@ -173,6 +173,53 @@ class TestVehicleController:
         assert "张三" in result or "拨打" in result
         assert controller.state.call_active
     
+    @pytest.mark.asyncio
+    async def test_missing_required_param(self, controller):
+        """测试缺少必需参数"""
+        result = await controller.execute("control_window", {"position": "all"})
+        
+        assert "缺少参数" in result
+        assert "action" in result
+        assert controller.state.windows.front_left == "closed"
+    
+    @pytest.mark.asyncio
+    async def test_invalid_param_value(self, controller):
+        """测试参数类型、枚举取值与数值范围校验"""
+        result = await controller.execute(
+            "control_air_conditioner", {"action": "on", "temperature": 40}
+        )
+        assert "超出范围" in result
+        assert controller.state.ac.is_on is False
+        
+        result = await controller.execute("control_window", {"position": "roof", "action": "open"})
+        assert "取值无效" in result
+        
+        result = await controller.execute(
+            "control_air_conditioner", {"action": "adjust", "temperature": "hot"}
+        )
+        assert "类型无效" in result
+        assert "'hot'" in result
+    
+    @pytest.mark.asyncio
+    async def test_param_type_coercion(self, controller):
+        """测试数字字符串与整数值浮点数转换为声明的类型"""
+        result = await controller.execute(
+            "control_air_conditioner", {"action": "on", "temperature": "26"}
+        )
+        assert "执行失败" not in result and "无效" not in result
+        assert controller.state.ac.temperature == 26
+        
+        result = await controller.execute(
+            "control_seat", {"seat": "driver", "function": "heating", "level": 2.0}
+        )
+        assert "无效" not in result
+        assert controller.state.driver_seat.heating == 2
+        
+        result = await controller.execute(
+            "control_seat", {"seat": "driver", "function": "heating", "level": "2"}
+        )
+        assert "执行失败" not in result and "无效" not in result
+    
     @pytest.mark.asyncio
     async def test_unknown_function(self, controller):
         """测试未知函数"""
@@ -255,6 +302,18 @@ class TestFunctionRegistry:
         
         assert "test_function" in registry.functions
         assert registry.get("test_function").name == "test_function"
+    
+    def test_cache_invalidated_on_register(self, registry):
+        """测试注册新函数后缓存失效"""
+        before_json = registry.to_json_schema()
+        before_prompt = registry.get_system_prompt_functions()
+        assert registry.to_json_schema() is before_json
+        
+        registry.register(FunctionDefinition(name="test_function", description="测试函数"))
+        
+        assert "test_function" in registry.to_json_schema()
+        assert "test_function" in registry.get_system_prompt_functions()
+        assert "test_function" not in before_prompt
 
 
 # ==============================================================================
@@ -296,6 +355,16 @@ class TestCockpitAssistant:
         
         assert len(response) > 0
     
+    @pytest.mark.asyncio
+    async def test_chat_into(self, assistant):
+        """测试回调式流式对话"""
+        chunks = []
+        await assistant.chat_into("把空调打开", chunks.append)
+        
+        assert len(chunks) > 0
+        assert "✅" in "".join(chunks)
+        assert assistant.controller.state.ac.is_on
+    
     def test_reset_conversation(self, assistant):
         """测试重置对话"""
         assistant.conversation_history.append(
@@ -306,6 +375,55 @@ class TestCockpitAssistant:
         
         assert len(assistant.conversation_history) == 0
     
+    @pytest.mark.asyncio
+    async def test_interrupted_reply_records_function(self, assistant):
+        """测试回复中断时已派发的函数调用仍记入历史"""
+        def sink(chunk):
+            if "好的" in chunk:
+                raise ConnectionError("client gone")
+        
+        with pytest.raises(ConnectionError):
+            await assistant.chat_into("打开空调", sink)
+        
+        assert assistant.controller.state.ac.is_on
+        last = assistant.conversation_history[-1]
+        assert last.role == "assistant"
+        assert last.function_call["name"] == "control_air_conditioner"
+    
+    @pytest.mark.asyncio
+    async def test_reset_conversation_async(self, assistant):
+        """测试异步重置对话"""
+        await assistant.chat_sync("你好")
+        
+        await assistant.reset_conversation_async()
+        
+        assert len(assistant.conversation_history) == 0
+    
+    @pytest.mark.asyncio
+    async def test_history_prefix_stable(self, assistant):
+        """测试历史裁剪前后消息列表保持前缀稳定"""
+        assistant.max_history = 8
+        previous = None
+        
+        for i in range(10):
+            await assistant.chat_sync(f"你好{i}")
+            assert len(assistant.conversation_history) <= assistant.max_history
+            
+            current = [m.content for m in assistant.conversation_history]
+            if previous is not None and len(current) > len(previous):
+                # 未发生裁剪时，本轮历史是上一轮历史的延伸
+                assert current[:len(previous)] == previous
+            previous = current
+    
+    @pytest.mark.asyncio
+    async def test_message_to_json(self, assistant):
+        """测试消息JSON序列化"""
+        async for _ in assistant.chat("把空调打开"):
+            pass
+        
+        for msg in assistant.conversation_history:
+            assert json.loads(msg.to_json()) == msg.to_dict()
+    
     def test_get_vehicle_state(self, assistant):
         """测试获取车辆状态"""
         state = assistant.get_vehicle_state()